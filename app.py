@@ -1,12 +1,206 @@
 """
-Файл для запуска парсера без бота (тестирование)
+Запуск парсера без бота: пакетная обработка товаров для cron/ETL.
+
+Артикулы (или ссылки) берутся из аргументов, файла (CSV, XLSX, TXT; "-" - stdin)
+и/или базы бота, обрабатываются пулом воркеров, а результат каждого товара
+сразу пишется строкой NDJSON (или элементом JSON-массива) в stdout или файл.
+
+Примеры:
+    python app.py 44587938 https://www.wildberries.ru/catalog/12345678/detail.aspx
+    python app.py -f skus.csv -c 20 -o reviews.ndjson
+    python app.py --db --since 2024-01-01T00:00:00Z > new_reviews.ndjson
+
+Код возврата: 0 - все товары обработаны, 1 - по части товаров были ошибки, 2 - нет входных данных.
 """
-from src.parser import WildberriesReviewParser
-from config.settings import PRODUCT_URL
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+from typing import IO, Dict, List, Optional
+
+from config.settings import PARSER_CONCURRENCY, PRODUCT_URL_TEMPLATE, ROOT_ID_CACHE_TTL
+from db.database import Database
+from src.catalog_files import CatalogFileError, read_articles
+from src.monitoring import ArticleGroup, parse_article_group, resolve_article_groups
+from src.parser import AsyncWildberriesReviewParser, ReviewsResult, extract_articles, review_timestamp_key
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Пакетный парсинг отзывов Wildberries с выводом в NDJSON/JSON")
+    parser.add_argument("articles", nargs="*", help="артикулы или ссылки на товары")
+    parser.add_argument("-f", "--file", action="append", default=[],
+                        help="файл со списком товаров (CSV, XLSX, TXT; '-' - stdin), можно несколько")
+    parser.add_argument("--db", nargs="?", const="db/database.db", metavar="PATH",
+                        help="взять все товары из базы бота (по умолчанию db/database.db)")
+    parser.add_argument("--user-id", type=int, help="с --db: только товары этого пользователя")
+    parser.add_argument("-c", "--concurrency", type=int, default=PARSER_CONCURRENCY,
+                        help=f"сколько запросов к API выполнять одновременно (по умолчанию {PARSER_CONCURRENCY})")
+    parser.add_argument("--since", help="только отзывы новее этой даты (ISO 8601)")
+    parser.add_argument("-o", "--output", help="файл для результата (по умолчанию stdout)")
+    parser.add_argument("--format", choices=("ndjson", "json"), default="ndjson", help="формат вывода")
+    parser.add_argument("-q", "--quiet", action="store_true", help="выводить в stderr только предупреждения и ошибки")
+    args = parser.parse_args(argv)
+    if args.user_id is not None and args.db is None:
+        parser.error("--user-id используется только вместе с --db")
+    if args.concurrency < 1:
+        parser.error("--concurrency должен быть больше 0")
+    if args.since is not None and not review_timestamp_key(args.since):
+        parser.error("--since должен быть датой в формате ISO 8601, например 2024-01-01T00:00:00Z")
+    return args
+
+
+async def collect_urls(args: argparse.Namespace, db: Optional[Database]) -> List[tuple]:
+    """Товары (article, url, root_id) из всех источников без повторов, в порядке появления"""
+    urls: Dict[str, tuple] = {}
+
+    if db is not None:
+        if args.user_id is not None:
+            rows = await db.get_user_urls_with_root_ids(args.user_id, ROOT_ID_CACHE_TTL)
+        else:
+            rows = await db.get_urls_with_root_ids(ROOT_ID_CACHE_TTL)
+        for article, url, root_id in rows:
+            urls.setdefault(article, (article, url, root_id))
+
+    articles = [article for value in args.articles for article in extract_articles(value)]
+    for path in args.file:
+        if path == "-":
+            articles.extend(read_articles(sys.stdin.buffer.read(), "stdin.txt"))
+        else:
+            with open(path, "rb") as file:
+                articles.extend(read_articles(file.read(), path))
+    for article in articles:
+        urls.setdefault(article, (article, PRODUCT_URL_TEMPLATE.format(article=article), None))
+
+    return list(urls.values())
+
+
+def group_record(group: ArticleGroup) -> dict:
+    """Строка результата: товар (группа вариантов с общим root ID) и найденные отзывы"""
+    record = {"articles": group.articles, "root_id": group.root_id}
+    if isinstance(group.result, BaseException):
+        record.update(status="error", error=str(group.result) or type(group.result).__name__)
+    elif group.root_id is None:
+        record.update(status="not_found", reviews=[])
+    else:
+        result: ReviewsResult = group.result
+        record.update(
+            status="ok",
+            newest_date=result.newest_date,
+            newest_id=result.newest_id,
+            reviews=[
+                {
+                    "id": review.get("id"),
+                    "created_date": review.get("createdDate"),
+                    "rating": review.get("productValuation"),
+                    "text": review.get("text", ""),
+                    "pros": review.get("pros", ""),
+                    "cons": review.get("cons", ""),
+                    "user_name": (review.get("wbUserDetails") or {}).get("name"),
+                }
+                for review in result.reviews
+            ]
+        )
+    return record
+
+
+class RecordWriter:
+    """Пишет результаты по мере готовности: строками NDJSON или элементами JSON-массива"""
+
+    def __init__(self, output: IO[str], output_format: str = "ndjson"):
+        self.output = output
+        self.output_format = output_format
+        self.count = 0
+
+    def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False)
+        if self.output_format == "json":
+            line = ("[\n" if self.count == 0 else ",\n") + line
+        else:
+            line += "\n"
+        self.output.write(line)
+        self.output.flush()
+        self.count += 1
+
+    def close(self):
+        if self.output_format == "json":
+            self.output.write("\n]\n" if self.count else "[]\n")
+        self.output.flush()
+
+
+async def run_workers(groups: List[ArticleGroup], parser: AsyncWildberriesReviewParser,
+                      db: Optional[Database], writer: RecordWriter, concurrency: int,
+                      since: Optional[str] = None) -> int:
+    """
+    Обрабатывает группы пулом из concurrency воркеров и пишет результат каждой сразу.
+    После записи результат группы отпускается, так что память не растет с числом товаров.
+    Возвращает количество групп с ошибкой.
+    """
+    # Общий итератор: каждый воркер берет следующую необработанную группу
+    pending = iter(groups)
+    failed = 0
+
+    async def worker():
+        nonlocal failed
+        for group in pending:
+            await parse_article_group(db, parser, group, since)
+            writer.write(group_record(group))
+            if isinstance(group.result, BaseException):
+                failed += 1
+            group.result = None
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(groups)))))
+    return failed
+
+
+async def run(args: argparse.Namespace) -> int:
+    if args.db and not os.path.exists(args.db):
+        logger.error(f"База данных не найдена: {args.db}")
+        return 2
+    db = Database(args.db) if args.db else None
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        try:
+            if db is not None:
+                # База бота могла быть создана старой версией: без миграций запись
+                # root ID и истории отзывов упала бы посреди обработки
+                await db.init_db()
+            urls = await collect_urls(args, db)
+        except (OSError, sqlite3.Error, CatalogFileError) as e:
+            logger.error(f"Не удалось прочитать список товаров: {e}")
+            return 2
+        if not urls:
+            logger.error("Нет товаров для обработки: передайте артикулы, --file или --db")
+            return 2
+
+        writer = RecordWriter(output, args.format)
+        # Пул соединений с запасом под хеджированные запросы к зеркалам
+        async with AsyncWildberriesReviewParser(concurrency=args.concurrency,
+                                                pool_size=args.concurrency * 2) as parser:
+            groups = await resolve_article_groups(db, parser, urls)
+            logger.info(f"Товаров: {len(urls)}, групп с общим root ID: {len(groups)}")
+            failed = await run_workers(groups, parser, db, writer, args.concurrency, args.since)
+        writer.close()
+
+        logger.info(f"Готово: {writer.count} записей, с ошибкой: {failed}")
+        return 1 if failed else 0
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if db is not None:
+            await db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.quiet:
+        logging.getLogger().setLevel(logging.WARNING)
+    return asyncio.run(run(args))
 
-def main():
-    parser = WildberriesReviewParser()
-    parser.parse_reviews(PRODUCT_URL)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1 @@
+# Бенчмарки парсера отзывов Wildberries
@@ -0,0 +1,246 @@
+"""
+Сквозной бенчмарк парсинга на локальной замене API WB (benchmarks.fake_wb), без доступа к сети.
+
+Сценарии:
+    sync - parse_reviews_sync для каждого товара по очереди (синхронный парсер на requests);
+    bot  - парсинг всех сохраненных товаров пользователя, как по кнопке бота (run_parsing):
+           временная база, root ID через API карточки, отчеты в очередь отправки
+           (отправка в Telegram заменена заглушкой, пауза между сообщениями чата отключена).
+
+Для каждого сценария и числа товаров: время, пропускная способность (товаров/с), p50/p99
+задержки на товар, RSS до начала и пиковый RSS процесса, число запросов к API.
+В sync задержка - время вызова parse_reviews_sync; в bot все товары запускаются сразу,
+и задержка - время от начала парсинга до готовности результата товара.
+Каждый сценарий выполняется в отдельном процессе, чтобы пиковый RSS относился только к нему.
+
+Все адреса замены API находятся на одном хосте, поэтому ограничение частоты (RATE_LIMIT_*)
+и circuit breaker общие для карточек и отзывов. Чтобы измерять сам код, а не ожидание
+ограничителя, задайте постоянную скорость --rps.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_end_to_end
+    python -m benchmarks.bench_end_to_end --flows bot --sizes 1000 --rps 1000 --reviews 5000
+    python -m benchmarks.bench_end_to_end --latency 0.1 --jitter 0.2 --error-rate 0.02 --throttle-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from benchmarks.fake_wb import FakeWbServer, add_config_arguments, config_from_args, use_fake_wb
+from config.settings import PRODUCT_URL_TEMPLATE
+from src.rate_limiter import AdaptiveTokenBucket, HostLimiter, RateLimiter
+
+FLOWS = ("sync", "bot")
+# Артикулы товаров сценария: ARTICLE_BASE, ARTICLE_BASE + 1, ...
+ARTICLE_BASE = 10_000_000
+USER_ID = 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Процентиль q (0-100) методом ближайшего ранга"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Пиковый RSS текущего процесса, МБ"""
+    # ru_maxrss в Linux переживает exec и может показать пик родительского процесса,
+    # а VmHWM считается заново для каждой программы
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В macOS ru_maxrss в байтах, в Linux - в килобайтах
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+class FixedRateLimiter(RateLimiter):
+    """Постоянная скорость rps на хост вместо адаптивной скорости RATE_LIMIT_*"""
+
+    def __init__(self, rps: float):
+        super().__init__()
+        self.rps = rps
+
+    def for_host(self, host: str) -> HostLimiter:
+        limiter = super().for_host(host)
+        if limiter.bucket.max_rate != self.rps:
+            limiter.bucket = AdaptiveTokenBucket(self.rps, capacity=self.rps, min_rate=self.rps, max_rate=self.rps)
+        return limiter
+
+
+class FakeTelegram:
+    """Заглушки бота и сообщения пользователя: считают отправленные и отредактированные сообщения"""
+
+    def __init__(self):
+        self.sent = 0
+        self.from_user = SimpleNamespace(id=USER_ID)
+        self.chat = SimpleNamespace(id=USER_ID)
+
+    async def send_message(self, chat_id: int, text: str, reply_markup=None):
+        self.sent += 1
+
+    async def answer(self, text: str, reply_markup=None) -> "FakeTelegram":
+        self.sent += 1
+        return self
+
+    async def edit_text(self, text: str):
+        pass
+
+
+def run_sync_flow(urls: List[str]) -> List[float]:
+    from bot.handlers import parse_reviews_sync
+    from src.parser import WildberriesReviewParser
+
+    parser = WildberriesReviewParser()
+    latencies = []
+    for url in urls:
+        started = time.perf_counter()
+        parse_reviews_sync(parser, url)
+        latencies.append(time.perf_counter() - started)
+    parser.session.close()
+    return latencies
+
+
+async def run_bot_flow(urls: List[str], mirrors: List[str], rps: Optional[float],
+                       measure: Dict[str, float]) -> List[float]:
+    import bot.handlers
+    import bot.send_queue
+    import src.monitoring
+    from bot.send_queue import SendQueue
+    from db.database import Database
+    from src.parser import AsyncWildberriesReviewParser, extract_articles
+
+    bot.send_queue.SEND_QUEUE_CHAT_INTERVAL = 0
+    telegram = FakeTelegram()
+    started = 0.0
+    ready: Dict[str, float] = {}
+
+    parse_article_group = src.monitoring.parse_article_group
+
+    async def timed_parse_article_group(db, parser, group, since=None):
+        result = await parse_article_group(db, parser, group, since)
+        elapsed = time.perf_counter() - started
+        for article in group.articles:
+            ready.setdefault(article, elapsed)
+        return result
+
+    src.monitoring.parse_article_group = timed_parse_article_group
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = bot.handlers.db = Database(os.path.join(tmp, "bench.db"))
+        await db.init_db()
+        await db.add_users([USER_ID])
+        await db.add_user_urls(USER_ID, [(extract_articles(url)[0], url, None) for url in urls], limit=len(urls))
+
+        send_queue = SendQueue(telegram)
+        parser = AsyncWildberriesReviewParser(feedbacks_mirrors=mirrors)
+        if rps is not None:
+            parser.rate_limiter = FixedRateLimiter(rps)
+        try:
+            measure["rss_before_mb"] = peak_rss_mb()
+            started = time.perf_counter()
+            await bot.handlers.run_parsing(telegram, parser, send_queue, incremental=False)
+            measure["elapsed"] = time.perf_counter() - started
+            await send_queue.close()
+        finally:
+            await parser.close()
+            await db.close()
+
+    measure["messages"] = telegram.sent
+    return list(ready.values())
+
+
+def run_worker(flow: str, size: int, base_url: str, rps: Optional[float]):
+    """Выполняет один сценарий в текущем процессе и печатает результат строкой JSON"""
+    logging.disable(logging.CRITICAL)
+    _, mirrors = use_fake_wb(base_url)
+    urls = [PRODUCT_URL_TEMPLATE.format(article=ARTICLE_BASE + i) for i in range(size)]
+    measure: Dict[str, float] = {}
+
+    if flow == "sync":
+        import bot.handlers  # Импорты не входят в замер памяти "до"
+        measure["rss_before_mb"] = peak_rss_mb()
+        started = time.perf_counter()
+        latencies = run_sync_flow(urls)
+        measure["elapsed"] = time.perf_counter() - started
+    else:
+        latencies = asyncio.run(run_bot_flow(urls, mirrors, rps, measure))
+
+    print(json.dumps({
+        **measure,
+        "articles": size,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def run_scenario(flow: str, size: int, server: FakeWbServer, rps: Optional[float]) -> dict:
+    """Запускает сценарий в отдельном процессе и добавляет к результату счетчики сервера"""
+    stats_before = server.stats.copy()
+    command = [sys.executable, "-m", "benchmarks.bench_end_to_end",
+               "--worker", flow, str(size), "--base-url", server.base_url]
+    if rps is not None:
+        command += ["--rps", str(rps)]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True)
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    stats = server.stats - stats_before
+    result.update(requests=stats["requests"], errors=stats[503] + stats[429])
+    return result
+
+
+def format_mb(value: Optional[float]) -> str:
+    return "н/д" if value is None else f"{value:.1f}"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--flows", nargs="+", choices=FLOWS, default=list(FLOWS))
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[1, 30, 1000])
+    arg_parser.add_argument("--rps", type=float,
+                            help="постоянная скорость запросов к хосту вместо RATE_LIMIT_* (только bot)")
+    add_config_arguments(arg_parser)
+    arg_parser.set_defaults(latency=0.02, jitter=0.01)
+    # Служебные параметры процесса одного сценария
+    arg_parser.add_argument("--worker", nargs=2, metavar=("FLOW", "SIZE"), help=argparse.SUPPRESS)
+    arg_parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        flow, size = args.worker
+        run_worker(flow, int(size), args.base_url, args.rps)
+        return
+
+    config = config_from_args(args)
+    print(f"Замена API WB: {config}, rps: {args.rps or 'RATE_LIMIT_*'}")
+    print(f"{'сценарий':>8} | {'товаров':>7} | {'время, с':>8} | {'товаров/с':>9} | {'p50, мс':>8} | "
+          f"{'p99, мс':>8} | {'RSS до, МБ':>10} | {'пик RSS, МБ':>11} | {'запросов':>8} | {'503/429':>7}")
+    with FakeWbServer(config) as server:
+        for flow in args.flows:
+            for size in args.sizes:
+                result = run_scenario(flow, size, server, args.rps)
+                print(f"{flow:>8} | {size:>7} | {result['elapsed']:>8.2f} | {size / result['elapsed']:>9.1f} | "
+                      f"{result['p50'] * 1000:>8.1f} | {result['p99'] * 1000:>8.1f} | "
+                      f"{format_mb(result['rss_before_mb']):>10} | {format_mb(result['peak_rss_mb']):>11} | "
+                      f"{result['requests']:>8} | {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
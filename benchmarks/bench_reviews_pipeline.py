@@ -0,0 +1,82 @@
+"""
+Микро-бенчмарк отбора отзывов: прежний конвейер filter -> sort -> filter
+против однопроходного ReviewsSelector на синтетических документах.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_reviews_pipeline --sizes 10000 100000
+"""
+import argparse
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from config.settings import MAX_REVIEWS, MAX_VALUATION
+from src.parser import BaseReviewParser
+
+
+def make_reviews(count: int, seed: int = 42) -> List[Dict]:
+    """Генерирует отзывы, похожие на ответ feedbacks/v2 (часть без текста, даты в случайном порядке)"""
+    rng = random.Random(seed)
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    reviews = []
+    for i in range(count):
+        created = start + timedelta(seconds=rng.randrange(3 * 365 * 24 * 3600))
+        has_text = rng.random() < 0.6
+        reviews.append({
+            'id': f"review{i}",
+            'text': "Товар пришел с браком, продавец не отвечает" if has_text else "",
+            'pros': "Быстрая доставка" if has_text and rng.random() < 0.3 else "",
+            'cons': "",
+            'productValuation': rng.randint(1, 5),
+            'createdDate': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'wbUserDetails': {'name': f"Покупатель {i}"},
+        })
+    return reviews
+
+
+def legacy_pipeline(reviews: List[Dict]) -> List[Dict]:
+    """Конвейер до перехода на однопроходный отбор (полная сортировка ISO-строк)"""
+    with_content = [
+        review for review in reviews
+        if review.get('text', '').strip() or review.get('pros', '').strip() or review.get('cons', '').strip()
+    ]
+    latest = sorted(with_content, key=lambda x: x.get('createdDate', ''), reverse=True)[:MAX_REVIEWS]
+    return [review for review in latest if review.get('productValuation', 5) <= MAX_VALUATION]
+
+
+def best_time(func, repeat: int) -> float:
+    """Лучшее время из repeat запусков, мс"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    arg_parser.add_argument('--repeat', type=int, default=7)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.INFO)
+    parser = BaseReviewParser()
+
+    print(f"{'отзывов':>10} | {'прежний, мс':>12} | {'один проход, мс':>16} | {'ускорение':>9}")
+    for size in args.sizes:
+        data = {'feedbacks': make_reviews(size)}
+
+        expected = legacy_pipeline(data['feedbacks'])
+        actual = parser.process_reviews(data)
+        assert actual == expected, "Результаты конвейеров расходятся"
+
+        legacy_ms = best_time(lambda: legacy_pipeline(data['feedbacks']), args.repeat)
+        single_pass_ms = best_time(lambda: parser.process_reviews(data), args.repeat)
+        print(f"{size:>10} | {legacy_ms:>12.2f} | {single_pass_ms:>16.2f} | {legacy_ms / single_pass_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Локальная замена API Wildberries для бенчмарков без доступа к сети: cards/v2/detail
+(пакетный запрос nm=1;2;3) и feedbacks/v2/{root}. Размер документа отзывов, задержка,
+доля ответов 503/429 и ненайденных товаров настраиваются; данные детерминированы (seed).
+
+Root ID артикула - article // variants, так что соседние артикулы могут быть вариантами
+одного товара. Документы отзывов генерируются один раз и отдаются с ETag (на If-None-Match - 304).
+
+Отдельный запуск (например, для ручной проверки curl):
+    python -m benchmarks.fake_wb --port 8099 --reviews 2000 --latency 0.05 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+import src.parser
+from benchmarks.bench_reviews_pipeline import make_reviews
+
+# Пути, повторяющие адреса настоящего API (см. CARD_API_BASE_URL и FEEDBACKS_API_MIRRORS)
+CARD_PATH = "/cards/v2/detail"
+CARD_QUERY = "?appType=1&curr=rub&dest=-59202&spp=30&ab_testing=false&nm="
+FEEDBACKS_PATHS = ("/feedbacks1/v2/", "/feedbacks2/v2/")
+
+
+@dataclass
+class FakeWbConfig:
+    """Размер ответов, задержка и внедряемые ошибки замены API WB"""
+    # Отзывов в документе feedbacks и сколько разных документов генерировать (товары получают их по кругу)
+    reviews: int = 500
+    documents: int = 50
+    # Артикулов на один root ID
+    variants: int = 1
+    # Задержка каждого ответа и случайная добавка к ней (от 0 до jitter), секунды
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Доля ответов 503 и 429 (с заголовком Retry-After)
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 1.0
+    # Доля артикулов, которых нет в каталоге
+    missing_rate: float = 0.0
+    # Отдавать отзывы без Content-Length (парсер разбирает их потоково)
+    chunked: bool = False
+    seed: int = 42
+
+
+class FakeWbServer:
+    """
+    HTTP-сервер с ответами в формате API WB. Запускается в отдельном потоке со своим
+    event loop, чтобы не делить процессорное время с измеряемым кодом того же loop.
+    В stats считаются запросы и отданные ответы по статусам.
+    """
+
+    def __init__(self, config: Optional[FakeWbConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeWbConfig()
+        self.host = host
+        self.port = port
+        self.stats: Counter = Counter()
+        self._rng = random.Random(self.config.seed)
+        self._documents: Dict[int, Tuple[bytes, str]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(CARD_PATH, self.handle_cards)
+        for path in FEEDBACKS_PATHS:
+            app.router.add_get(path + "{root_id}", self.handle_feedbacks)
+        return app
+
+    def root_id(self, article: str) -> Optional[str]:
+        """Root ID артикула или None, если товара "нет в каталоге" (одинаково при каждом запуске)"""
+        if not article.isdigit():
+            return None
+        if self.config.missing_rate and zlib.crc32(article.encode()) % 10_000 < self.config.missing_rate * 10_000:
+            return None
+        return str(int(article) // self.config.variants)
+
+    def build_documents(self):
+        """
+        Генерирует все документы отзывов заранее: иначе первый запрос каждого документа
+        платил бы за генерацию внутри замера (и провоцировал хеджирование)
+        """
+        for index in range(self.config.documents):
+            if index in self._documents:
+                continue
+            reviews = make_reviews(self.config.reviews, seed=self.config.seed + index)
+            body = json.dumps({
+                "feedbackCount": len(reviews),
+                "valuation": "4.6",
+                "feedbacks": reviews,
+            }, ensure_ascii=False).encode()
+            self._documents[index] = (body, f'"{self.config.seed}-{index}-{len(reviews)}"')
+
+    def document(self, root_id: str) -> Tuple[bytes, str]:
+        """Тело ответа feedbacks и его ETag"""
+        return self._documents[int(root_id) % self.config.documents]
+
+    async def _inject(self, request: web.Request) -> Optional[web.Response]:
+        """Задержка и случайная ошибка; None - отвечать как обычно"""
+        self.stats["requests"] += 1
+        delay = self.config.latency + self._rng.uniform(0, self.config.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self._rng.random()
+        if roll < self.config.error_rate:
+            self.stats[503] += 1
+            return web.Response(status=503)
+        if roll < self.config.error_rate + self.config.throttle_rate:
+            self.stats[429] += 1
+            return web.Response(status=429, headers={"Retry-After": str(self.config.retry_after)})
+        return None
+
+    async def handle_cards(self, request: web.Request) -> web.StreamResponse:
+        error = await self._inject(request)
+        if error is not None:
+            return error
+        products = []
+        for article in request.query.get("nm", "").split(";"):
+            root_id = self.root_id(article)
+            if root_id is not None:
+                products.append({"id": int(article), "root": int(root_id), "name": f"Товар {article}"})
+        self.stats[200] += 1
+        return web.json_response({"state": 0, "data": {"products": products}})
+
+    async def handle_feedbacks(self, request: web.Request) -> web.StreamResponse:
+        error = await self._inject(request)
+        if error is not None:
+            return error
+        root_id = request.match_info["root_id"]
+        if not root_id.isdigit():
+            self.stats[404] += 1
+            return web.Response(status=404)
+        body, etag = self.document(root_id)
+        if request.headers.get("If-None-Match") == etag:
+            self.stats[304] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+
+        self.stats[200] += 1
+        if not self.config.chunked:
+            return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+        response = web.StreamResponse(headers={"ETag": etag, "Content-Type": "application/json"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for start in range(0, len(body), 64 * 1024):
+            await response.write(body[start:start + 64 * 1024])
+        await response.write_eof()
+        return response
+
+    def start(self) -> str:
+        """Запускает сервер в фоновом потоке и возвращает его адрес"""
+        self.build_documents()
+        # Сокет открывается заранее: так при port=0 известен выбранный системой порт
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        async def serve():
+            self._runner = web.AppRunner(self.make_app(), access_log=None)
+            await self._runner.setup()
+            await web.SockSite(self._runner, sock).start()
+            ready.set()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-wb", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.base_url
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self) -> "FakeWbServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def use_fake_wb(base_url: str) -> Tuple[str, list]:
+    """
+    Направляет парсеры на сервер base_url вместо WB. Возвращает адрес API карточки
+    и список зеркал отзывов (зеркала передаются в AsyncWildberriesReviewParser явно).
+    """
+    card_url = f"{base_url}{CARD_PATH}{CARD_QUERY}"
+    mirrors = [f"{base_url}{path}" for path in FEEDBACKS_PATHS]
+    src.parser.CARD_API_BASE_URL = card_url
+    src.parser.FEEDBACKS_API_BASE_URL = mirrors[0]
+    src.parser.FEEDBACKS_API_MIRRORS = mirrors
+    return card_url, mirrors
+
+
+def add_config_arguments(arg_parser: argparse.ArgumentParser):
+    """Параметры FakeWbConfig в командной строке (общие для сервера и бенчмарков)"""
+    defaults = FakeWbConfig()
+    group = arg_parser.add_argument_group("замена API WB")
+    group.add_argument("--reviews", type=int, default=defaults.reviews, help="отзывов в документе товара")
+    group.add_argument("--documents", type=int, default=defaults.documents, help="разных документов отзывов")
+    group.add_argument("--variants", type=int, default=defaults.variants, help="артикулов на один root ID")
+    group.add_argument("--latency", type=float, default=defaults.latency, help="задержка ответа, с")
+    group.add_argument("--jitter", type=float, default=defaults.jitter, help="случайная добавка к задержке, с")
+    group.add_argument("--error-rate", type=float, default=defaults.error_rate, help="доля ответов 503")
+    group.add_argument("--throttle-rate", type=float, default=defaults.throttle_rate, help="доля ответов 429")
+    group.add_argument("--retry-after", type=float, default=defaults.retry_after, help="Retry-After ответов 429, с")
+    group.add_argument("--missing-rate", type=float, default=defaults.missing_rate, help="доля ненайденных товаров")
+    group.add_argument("--chunked", action="store_true", help="отдавать отзывы без Content-Length")
+    group.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeWbConfig:
+    return FakeWbConfig(
+        reviews=args.reviews, documents=args.documents, variants=args.variants,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+        missing_rate=args.missing_rate, chunked=args.chunked, seed=args.seed,
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8099)
+    add_config_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    server = FakeWbServer(config_from_args(args), args.host, args.port)
+    server.build_documents()
+    print(f"Карточки: {server.base_url}{CARD_PATH}{CARD_QUERY}<nm>")
+    print(f"Отзывы:   {', '.join(server.base_url + path + '<root>' for path in FEEDBACKS_PATHS)}")
+    web.run_app(server.make_app(), host=args.host, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
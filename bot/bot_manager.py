@@ -1,22 +1,94 @@
 import asyncio
 import logging
+from aiohttp import web
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.webhook.aiohttp_server import setup_application
 
-from config.settings import BOT_TOKEN
-from bot.handlers import router
+from config.settings import (
+    BOT_TOKEN, TELEGRAM_USER_ID, TELEGRAM_USER_IDS, MONITOR_ENABLED,
+    BOT_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT,
+    WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE
+)
+from bot.handlers import router, db
+from bot.scheduler import ReviewScheduler
+from bot.send_queue import SendQueue
+from bot.storage import create_fsm_storage
+from bot.webhook import QueuedRequestHandler
+from src.parser import AsyncWildberriesReviewParser
 
 class BotManager:
     def __init__(self):
         self.bot = Bot(token=BOT_TOKEN)
-        self.dp = Dispatcher(storage=MemoryStorage())
+        # Один парсер (и пул соединений) на все приложение; передается в хендлеры как parser
+        self.parser = AsyncWildberriesReviewParser()
+        # Очередь отправки отчетов с учетом лимитов Telegram; в хендлерах - send_queue
+        self.send_queue = SendQueue(self.bot)
+        # Состояния диалогов хранятся в базе (FSM_STORAGE) и переживают перезапуск
+        self.dp = Dispatcher(storage=create_fsm_storage(db), parser=self.parser, send_queue=self.send_queue)
         self.dp.include_router(router)
+        self.scheduler = ReviewScheduler(self.send_queue, db, self.parser)
+        self.dp.startup.register(self.on_startup)
+        self.dp.shutdown.register(self.on_shutdown)
+    
+    async def on_startup(self):
+        # Создаем таблицы и применяем миграции схемы
+        await db.init_db(owner_id=TELEGRAM_USER_ID or None)
+        await db.add_users(TELEGRAM_USER_IDS)
+        if MONITOR_ENABLED:
+            self.scheduler.start()
+    
+    async def on_shutdown(self):
+        await self.scheduler.stop()
+        await self.send_queue.close()
+        await self.parser.close()
+        await db.close()
     
     async def start(self):
         logging.basicConfig(level=logging.INFO)
         logging.info("Запуск Telegram бота...")
+        if BOT_MODE == "webhook":
+            await self.start_webhook()
+        else:
+            await self.start_polling()
+    
+    async def start_polling(self):
+        # getUpdates не работает, пока установлен webhook (например, после запуска в режиме webhook)
+        await self.bot.delete_webhook()
         await self.dp.start_polling(self.bot)
+    
+    async def start_webhook(self):
+        if not WEBHOOK_URL:
+            raise ValueError("Для режима webhook нужно задать WEBHOOK_URL")
+        
+        app = web.Application()
+        handler = QueuedRequestHandler(
+            self.dp, self.bot, workers=WEBHOOK_WORKERS, queue_size=WEBHOOK_QUEUE_SIZE,
+            secret_token=WEBHOOK_SECRET
+        )
+        # Порядок важен для остановки: сначала дорабатываем принятые апдейты,
+        # затем выполняется on_shutdown бота и только потом закрывается сессия бота
+        app.on_startup.append(handler.start_workers)
+        app.on_shutdown.append(handler.stop_workers)
+        setup_application(app, self.dp, bot=self.bot)
+        handler.register(app, path=WEBHOOK_PATH)
+        app.on_startup.append(self._set_webhook)
+        
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+            logging.info(f"Webhook слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+    
+    async def _set_webhook(self, app: web.Application):
+        await self.bot.set_webhook(
+            WEBHOOK_URL + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=self.dp.resolve_used_update_types()
+        )
 
 async def run_bot():
     bot_manager = BotManager()
-    await bot_manager.start()
\ No newline at end of file
+    await bot_manager.start()
@@ -2,15 +2,21 @@ from enum import Enum
 
 class Commands:
     START = "start"
+    ADD_USER = "adduser"
+    DELETE_USER = "deluser"
+    USERS = "users"
 
 class ButtonTexts:
     PARSE_REVIEWS = "🔍 Парсить отзывы"
+    PARSE_NEW_REVIEWS = "🆕 Новые отзывы"
     SETTINGS = "⚙️ Настройки"
     MAIN_MENU = "🏠 Главное меню"
     LINKS = "🔗 Ссылки"
     ADD_LINK = "➕ Добавить ссылку"
     DELETE_LINK = "🗑 Удалить ссылку"
     SHOW_ALL_LINKS = "📋 Показать все ссылки"
+    SEARCH_LINKS = "🔎 Найти по артикулу"
+    EXPORT_LINKS = "📤 Выгрузить в файл"
     BACK = "⬅️ Назад"
 
 class CallbackData:
@@ -19,6 +25,8 @@ class CallbackData:
     CANCEL_LINKS = "cancel_links"
     CONFIRM_DELETE = "confirm_delete"
     CANCEL_DELETE = "cancel_delete"
+    # Листание списка ссылок: links_page:<n|p>:<номер первой строки>:<артикул-курсор>:<поиск>
+    LINKS_PAGE = "links_page"
 
 class Messages:
     ACCESS_DENIED = "❌ Доступ запрещен. Бот доступен только авторизованным пользователям."
@@ -43,24 +51,46 @@ class Messages:
     MAIN_MENU_TEXT = "Главное меню:"
     
     # Управление ссылками
-    LINKS_MANAGEMENT = "Управление ссылками (сохранено: {count}/30):"
+    LINKS_MANAGEMENT = "Управление ссылками (сохранено: {count}/{limit}):"
     NO_SAVED_LINKS = "Нет сохраненных ссылок."
     NO_SAVED_LINKS_ADD = "Нет сохраненных ссылок. Добавьте ссылки в настройках."
-    SAVED_LINKS_LIST = "Сохраненные ссылки:\n\n"
+    SAVED_LINKS_LIST = "Сохраненные ссылки ({first}-{last} из {total}):\n\n"
+    FOUND_LINKS_LIST = "Найдено по «{query}» ({first}-{last} из {total}):\n\n"
+    SEARCH_LINKS = "Отправьте артикул или его начало:"
+    INVALID_SEARCH = "Артикул состоит только из цифр. Попробуйте еще раз."
+    NOTHING_FOUND = "Ничего не найдено по «{query}»."
+    AND_MORE = "... и еще {count}"
     
     # Добавление ссылок
-    SEND_LINKS = "Отправьте ссылки на товары Wildberries (можно несколько за раз):"
-    LINKS_LIMIT_REACHED = "Достигнут лимит в 30 ссылок. Удалите старые ссылки."
+    SEND_LINKS = (
+        "Отправьте ссылки на товары Wildberries или артикулы (можно несколько за раз) "
+        "либо файл CSV, XLSX или TXT со списком товаров:"
+    )
+    LINKS_LIMIT_REACHED = "Достигнут лимит в {limit} ссылок. Удалите старые ссылки."
     NO_VALID_LINKS = "Не найдено корректных ссылок. Попробуйте еще раз."
+    ARTICLES_NOT_FOUND = "Товары не найдены на Wildberries и пропущены: {articles}"
+    ARTICLES_NOT_VERIFIED = "Не удалось проверить товары (Wildberries не ответил), они будут добавлены: {articles}"
     LINKS_LIMIT_EXCEEDED = "Превышен лимит! Можно добавить только {available} ссылок."
     CONFIRM_ADD_LINKS = "Добавить эти {count} ссылок для обработки?\n\n"
     LINKS_SAVED = "Сохранено {count} ссылок!"
     OPERATION_CANCELLED = "Операция отменена."
     SEND_MORE_LINKS = "Отправьте еще ссылки:"
     
+    # Импорт и выгрузка
+    IMPORT_STARTED = "Читаю файл и проверяю товары..."
+    IMPORT_FILE_TOO_LARGE = "Файл слишком большой (максимум {limit} МБ)."
+    IMPORT_FILE_ERROR = "Не удалось прочитать файл: {error}"
+    IMPORT_NO_ARTICLES = "В файле не найдено артикулов или ссылок на товары."
+    IMPORT_DONE = (
+        "Импорт завершен: найдено {found}, добавлено {saved}, уже были {existing}, "
+        "не найдены на Wildberries {missing}, сверх лимита {over_limit}."
+    )
+    EXPORT_CAPTION = "Товаров: {count}"
+    EXPORT_ERROR = "Не удалось сформировать файл: {error}"
+    
     # Удаление ссылок
     NO_LINKS_TO_DELETE = "Нет ссылок для удаления."
-    DELETE_INSTRUCTIONS = "Введите номера или артикулы для удаления (через запятую):\n\n"
+    DELETE_INSTRUCTIONS = "Введите номера или артикулы для удаления (через запятую):"
     NO_MATCHING_LINKS = "Не найдено подходящих ссылок для удаления."
     CONFIRM_DELETE_LINKS = "Точно удалить эти артикулы?\n\n"
     LINKS_DELETED = "Удалено {count} ссылок!"
@@ -70,6 +100,18 @@ class Messages:
     PARSING_ALL_LINKS = "Начинаю парсинг всех сохраненных ссылок..."
     PARSING_ERROR_ARTICLE = "Ошибка при парсинге {article}: {error}"
     PARSING_COMPLETED = "Парсинг завершен!"
+    PARSING_NEW_LINKS = "Ищу новые отзывы по всем сохраненным ссылкам..."
+    NO_NEW_LOW_RATING_REVIEWS = "Новых отзывов с низкой оценкой нет."
+    PROGRESS = "⏳ Обработано {done}/{total}, ошибок: {errors}, осталось ~{eta} с"
+    PROGRESS_DONE = "✅ Обработано {done}/{total} за {elapsed} с, ошибок: {errors}"
+    
+    # Пользователи
+    USER_COMMAND_USAGE = "Использование: /{command} <telegram id>"
+    USER_ADDED = "Пользователь {user_id} получил доступ к боту."
+    USER_DELETED = "Пользователь {user_id} удален вместе с его ссылками."
+    USER_NOT_FOUND = "Пользователь {user_id} не найден."
+    CANNOT_DELETE_SELF = "Нельзя удалить самого себя."
+    USERS_LIST = "Пользователи бота:\n\n"
 
 class Emojis:
     SEARCH = "🔍"
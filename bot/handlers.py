@@ -1,17 +1,25 @@
-from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command, StateFilter
+from aiogram import Bot, Router, F
+from aiogram.types import Message, CallbackQuery, BufferedInputFile
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from bot.keyboards import (
     get_main_keyboard, get_settings_keyboard, get_links_keyboard, 
-    get_back_keyboard, get_add_links_inline_keyboard, get_delete_confirmation_keyboard
+    get_back_keyboard, get_add_links_inline_keyboard, get_delete_confirmation_keyboard,
+    get_links_page_keyboard
 )
 from bot.enums import Commands, ButtonTexts, Messages, Emojis, CallbackData
-from src.parser import WildberriesReviewParser
-from config.settings import TELEGRAM_USER_ID
+from src.parser import AsyncWildberriesReviewParser
+from src.monitoring import resolve_article_groups, iter_parsed_groups, group_marks
+from src.catalog_files import CatalogFileError, read_articles, write_csv, write_xlsx
+from config.settings import (
+    ROOT_ID_CACHE_TTL, MAX_LINKS_PER_USER, LINKS_PAGE_SIZE, PRODUCT_URL_TEMPLATE,
+    IMPORT_MAX_FILE_SIZE, EXPORT_FORMAT, EXPORT_REVIEWS_PER_ARTICLE
+)
 from db.database import Database
+from bot.progress import ProgressMessage
+from bot.send_queue import SendQueue
 
 router = Router()
 
@@ -21,51 +29,167 @@ class ParsingStates(StatesGroup):
 class LinkStates(StatesGroup):
     adding_links = State()
     deleting_links = State()
+    searching_links = State()
 
 db = Database()
 
-def check_user_access(user_id: int) -> bool:
-    return user_id == TELEGRAM_USER_ID
+async def check_user_access(user_id: int) -> bool:
+    return await db.is_user(user_id)
+
+async def links_management_text(user_id: int) -> str:
+    return Messages.LINKS_MANAGEMENT.format(count=await db.get_user_urls_count(user_id), limit=MAX_LINKS_PER_USER)
+
+def articles_preview(articles: list, limit: int = LINKS_PAGE_SIZE) -> str:
+    """Артикулы через запятую; длинный список обрезается до limit"""
+    text = ", ".join(articles[:limit])
+    if len(articles) > limit:
+        text += " " + Messages.AND_MORE.format(count=len(articles) - limit)
+    return text
+
+async def render_links_page(user_id: int, offset: int = 0, after: str = None, before: str = None,
+                            query: str = ""):
+    """
+    Текст и клавиатура одной страницы списка ссылок пользователя. Страницы выбираются
+    по артикулу-курсору (after/before), offset - номер первой строки страницы (с 0).
+    Возвращает (None, None), если показывать нечего.
+    """
+    # Берем на одну запись больше, чтобы знать, есть ли следующая страница
+    rows = await db.get_user_urls_page(user_id, LINKS_PAGE_SIZE + 1, after=after, before=before, prefix=query)
+    if before is not None:
+        has_prev, has_next = len(rows) > LINKS_PAGE_SIZE, True
+        rows = rows[-LINKS_PAGE_SIZE:]
+    else:
+        has_prev, has_next = offset > 0, len(rows) > LINKS_PAGE_SIZE
+        rows = rows[:LINKS_PAGE_SIZE]
+    if not rows:
+        return None, None
+    
+    total = await db.get_user_urls_count(user_id, prefix=query)
+    header = Messages.FOUND_LINKS_LIST if query else Messages.SAVED_LINKS_LIST
+    text = header.format(query=query, first=offset + 1, last=offset + len(rows), total=total)
+    text += "".join(f"{i}. {article}\n{url}\n\n" for i, (article, url) in enumerate(rows, offset + 1))
+    keyboard = get_links_page_keyboard(offset, rows[0][0], rows[-1][0], has_prev, has_next, query)
+    return text, keyboard
 
 @router.message(Command(Commands.START))
 async def start_handler(message: Message):
-    if not check_user_access(message.from_user.id):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED)
         return
     
     await message.answer(Messages.WELCOME, reply_markup=get_main_keyboard())
 
+# Управление пользователями (только администратор)
+def parse_user_id_argument(command: CommandObject):
+    args = (command.args or "").strip()
+    return int(args) if args.isdigit() else None
+
+@router.message(Command(Commands.ADD_USER))
+async def add_user_handler(message: Message, command: CommandObject):
+    if not await db.is_admin(message.from_user.id):
+        await message.answer(Messages.ACCESS_DENIED_SHORT)
+        return
+    
+    user_id = parse_user_id_argument(command)
+    if user_id is None:
+        await message.answer(Messages.USER_COMMAND_USAGE.format(command=Commands.ADD_USER))
+        return
+    
+    await db.add_users([user_id])
+    await message.answer(Messages.USER_ADDED.format(user_id=user_id))
+
+@router.message(Command(Commands.DELETE_USER))
+async def delete_user_handler(message: Message, command: CommandObject):
+    if not await db.is_admin(message.from_user.id):
+        await message.answer(Messages.ACCESS_DENIED_SHORT)
+        return
+    
+    user_id = parse_user_id_argument(command)
+    if user_id is None:
+        await message.answer(Messages.USER_COMMAND_USAGE.format(command=Commands.DELETE_USER))
+        return
+    if user_id == message.from_user.id:
+        await message.answer(Messages.CANNOT_DELETE_SELF)
+        return
+    
+    if await db.delete_user(user_id):
+        await message.answer(Messages.USER_DELETED.format(user_id=user_id))
+    else:
+        await message.answer(Messages.USER_NOT_FOUND.format(user_id=user_id))
+
+@router.message(Command(Commands.USERS))
+async def users_handler(message: Message):
+    if not await db.is_admin(message.from_user.id):
+        await message.answer(Messages.ACCESS_DENIED_SHORT)
+        return
+    
+    response = Messages.USERS_LIST
+    for i, (user_id, is_admin, links_count) in enumerate(await db.get_users(), 1):
+        role = " (администратор)" if is_admin else ""
+        response += f"{i}. {user_id}{role} - ссылок: {links_count}\n"
+    
+    await message.answer(response)
+
 # Главное меню
 @router.message(F.text == ButtonTexts.PARSE_REVIEWS)
-async def parse_button_handler(message: Message, state: FSMContext):
-    if not check_user_access(message.from_user.id):
+async def parse_button_handler(message: Message, state: FSMContext, parser: AsyncWildberriesReviewParser,
+                               send_queue: SendQueue):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         return
     
-    urls = await db.get_all_urls()
+    await run_parsing(message, parser, send_queue, incremental=False)
+
+@router.message(F.text == ButtonTexts.PARSE_NEW_REVIEWS)
+async def parse_new_button_handler(message: Message, state: FSMContext, parser: AsyncWildberriesReviewParser,
+                                   send_queue: SendQueue):
+    if not await check_user_access(message.from_user.id):
+        await message.answer(Messages.ACCESS_DENIED_SHORT)
+        return
+    
+    await run_parsing(message, parser, send_queue, incremental=True)
+
+async def run_parsing(message: Message, parser: AsyncWildberriesReviewParser, send_queue: SendQueue,
+                      incremental: bool):
+    user_id = message.from_user.id
+    chat_id = message.chat.id
+    urls = await db.get_user_urls_with_root_ids(user_id, ROOT_ID_CACHE_TTL)
     if not urls:
         await message.answer(Messages.NO_SAVED_LINKS_ADD, reply_markup=get_main_keyboard())
         return
     
-    await message.answer(Messages.PARSING_ALL_LINKS)
-    
-    for article, url in urls:
-        try:
-            parser = WildberriesReviewParser()
-            result = await parse_reviews_async(parser, url)
-            
-            # Отправляем сообщение для каждого артикула независимо от результата
-            response = format_article_reviews_response(article, result)
-            await message.answer(response)
-            
-        except Exception as e:
-            await message.answer(Messages.PARSING_ERROR_ARTICLE.format(article=article, error=str(e)))
-    
-    await message.answer(Messages.PARSING_COMPLETED, reply_markup=get_main_keyboard())
+    progress = ProgressMessage(Messages.PARSING_NEW_LINKS if incremental else Messages.PARSING_ALL_LINKS, len(urls))
+    await progress.start(message)
+    
+    # Все товары парсятся конкурентно, результат каждого ставится в очередь отправки сразу
+    # по готовности; очередь упаковывает отчеты в сообщения с учетом лимитов Telegram.
+    # Варианты одного товара (общий root ID) загружаются один раз и выводятся вместе
+    marks = await db.get_subscription_marks(user_id) if incremental else None
+    groups = await resolve_article_groups(db, parser, urls)
+    
+    sent_count = 0
+    async for group in iter_parsed_groups(db, parser, groups, marks):
+        result = group.result
+        failed = isinstance(result, BaseException)
+        if failed:
+            send_queue.send(chat_id, Messages.PARSING_ERROR_ARTICLE.format(article=group.label, error=str(result)))
+        elif result.reviews:
+            # Товары без отзывов с низкой оценкой учитываются только в сообщении о прогрессе
+            send_queue.send(chat_id, format_article_reviews_response(group.label, result.reviews))
+            sent_count += 1
+        await progress.advance(len(group.articles), failed=failed)
+    
+    await progress.finish()
+    await db.update_subscription_marks(group_marks(groups), user_id)
+    
+    if not sent_count:
+        send_queue.send(chat_id, Messages.NO_NEW_LOW_RATING_REVIEWS if incremental else Messages.NO_LOW_RATING_REVIEWS)
+    
+    send_queue.send(chat_id, Messages.PARSING_COMPLETED, reply_markup=get_main_keyboard())
 
 @router.message(F.text == ButtonTexts.SETTINGS)
 async def settings_handler(message: Message):
-    if not check_user_access(message.from_user.id):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         return
     
@@ -73,7 +197,7 @@ async def settings_handler(message: Message):
 
 @router.message(F.text == ButtonTexts.MAIN_MENU)
 async def main_menu_handler(message: Message, state: FSMContext):
-    if not check_user_access(message.from_user.id):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         return
     
@@ -83,202 +207,328 @@ async def main_menu_handler(message: Message, state: FSMContext):
 # Управление ссылками
 @router.message(F.text == ButtonTexts.LINKS)
 async def links_handler(message: Message):
-    if not check_user_access(message.from_user.id):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         return
     
-    count = await db.get_urls_count()
-    await message.answer(Messages.LINKS_MANAGEMENT.format(count=count), reply_markup=get_links_keyboard())
+    await message.answer(await links_management_text(message.from_user.id), reply_markup=get_links_keyboard())
 
 @router.message(F.text == ButtonTexts.SHOW_ALL_LINKS)
 async def show_all_links_handler(message: Message):
-    if not check_user_access(message.from_user.id):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         return
     
-    urls = await db.get_all_urls()
-    if not urls:
+    text, keyboard = await render_links_page(message.from_user.id)
+    if text is None:
         await message.answer(Messages.NO_SAVED_LINKS)
         return
     
-    response = Messages.SAVED_LINKS_LIST
-    for i, (article, url) in enumerate(urls, 1):
-        response += f"{i}. {article}\n{url}\n\n"
+    await message.answer(text, reply_markup=keyboard)
+
+@router.callback_query(F.data.startswith(CallbackData.LINKS_PAGE + ":"))
+async def links_page_callback(callback: CallbackQuery):
+    if not await check_user_access(callback.from_user.id):
+        await callback.answer(Messages.ACCESS_DENIED_SHORT, show_alert=True)
+        return
     
-    await message.answer(response)
+    _, direction, offset, cursor, query = callback.data.split(":", 4)
+    offset = int(offset)
+    if direction == "n":
+        text, keyboard = await render_links_page(
+            callback.from_user.id, offset + LINKS_PAGE_SIZE, after=cursor, query=query
+        )
+    else:
+        text, keyboard = await render_links_page(
+            callback.from_user.id, max(offset - LINKS_PAGE_SIZE, 0), before=cursor, query=query
+        )
+    if text is not None:
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
+
+@router.message(F.text == ButtonTexts.SEARCH_LINKS)
+async def search_links_handler(message: Message, state: FSMContext):
+    if not await check_user_access(message.from_user.id):
+        await message.answer(Messages.ACCESS_DENIED_SHORT)
+        return
+    
+    await message.answer(Messages.SEARCH_LINKS, reply_markup=get_back_keyboard())
+    await state.set_state(LinkStates.searching_links)
+
+@router.message(StateFilter(LinkStates.searching_links))
+async def search_query_handler(message: Message, state: FSMContext):
+    if not await check_user_access(message.from_user.id):
+        await message.answer(Messages.ACCESS_DENIED_SHORT)
+        await state.clear()
+        return
+    
+    if message.text == ButtonTexts.BACK:
+        await state.clear()
+        await message.answer(await links_management_text(message.from_user.id), reply_markup=get_links_keyboard())
+        return
+    
+    query = (message.text or "").strip()
+    # Запрос попадает в callback_data кнопок листания, а она ограничена 64 байтами
+    if not query.isdigit() or len(query) > 15:
+        await message.answer(Messages.INVALID_SEARCH)
+        return
+    
+    text, keyboard = await render_links_page(message.from_user.id, query=query)
+    await message.answer(text or Messages.NOTHING_FOUND.format(query=query), reply_markup=keyboard)
 
 @router.message(F.text == ButtonTexts.ADD_LINK)
 async def add_link_handler(message: Message, state: FSMContext):
-    if not check_user_access(message.from_user.id):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         return
     
-    count = await db.get_urls_count()
-    if count >= 30:
-        await message.answer(Messages.LINKS_LIMIT_REACHED)
+    count = await db.get_user_urls_count(message.from_user.id)
+    if count >= MAX_LINKS_PER_USER:
+        await message.answer(Messages.LINKS_LIMIT_REACHED.format(limit=MAX_LINKS_PER_USER))
         return
     
     await message.answer(Messages.SEND_LINKS, reply_markup=get_back_keyboard())
     await state.set_state(LinkStates.adding_links)
-    await state.update_data(pending_links=[])
+    await state.update_data(pending_articles=[])
+
+@router.message(StateFilter(LinkStates.adding_links), F.document)
+async def import_links_handler(message: Message, bot: Bot, parser: AsyncWildberriesReviewParser):
+    """
+    Импорт товаров из файла: все артикулы проверяются пачками запросов к API карточки
+    и сохраняются одной транзакцией, без подтверждения
+    """
+    if not await check_user_access(message.from_user.id):
+        await message.answer(Messages.ACCESS_DENIED_SHORT)
+        return
+    
+    document = message.document
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await message.answer(Messages.IMPORT_FILE_TOO_LARGE.format(limit=IMPORT_MAX_FILE_SIZE // (1024 * 1024)))
+        return
+    
+    await message.answer(Messages.IMPORT_STARTED)
+    file = await bot.download(document)
+    try:
+        articles = read_articles(file.read(), document.file_name)
+    except CatalogFileError as e:
+        await message.answer(Messages.IMPORT_FILE_ERROR.format(error=e))
+        return
+    if not articles:
+        await message.answer(Messages.IMPORT_NO_ARTICLES)
+        return
+    
+    user_id = message.from_user.id
+    existing_articles = await db.get_user_articles(user_id, articles)
+    new_articles = [article for article in articles if article not in existing_articles]
+    available = max(MAX_LINKS_PER_USER - await db.get_user_urls_count(user_id), 0)
+    over_limit = max(len(new_articles) - available, 0)
+    new_articles = new_articles[:available]
+    
+    lookups = await parser.lookup_root_ids(new_articles)
+    missing_articles = [article for article in new_articles if lookups.get(article) is None]
+    unverified_articles = [article for article in new_articles if isinstance(lookups.get(article), BaseException)]
+    if missing_articles:
+        await message.answer(Messages.ARTICLES_NOT_FOUND.format(articles=articles_preview(missing_articles)))
+    if unverified_articles:
+        await message.answer(Messages.ARTICLES_NOT_VERIFIED.format(articles=articles_preview(unverified_articles)))
+    
+    rows = []
+    for article in new_articles:
+        root_id = lookups.get(article)
+        if root_id is None:
+            continue
+        # Непроверенные товары (WB не ответил) сохраняем без root ID, как и при вставке ссылок
+        rows.append((article, PRODUCT_URL_TEMPLATE.format(article=article), root_id if isinstance(root_id, str) else None))
+    saved_count = await db.add_user_urls(user_id, rows, MAX_LINKS_PER_USER)
+    
+    await message.answer(Messages.IMPORT_DONE.format(
+        found=len(articles), saved=saved_count, existing=len(existing_articles),
+        missing=len(missing_articles), over_limit=over_limit
+    ))
+    await message.answer(await links_management_text(user_id))
+
+@router.message(F.text == ButtonTexts.EXPORT_LINKS)
+async def export_links_handler(message: Message):
+    """Выгрузка товаров пользователя и последних сохраненных отзывов по ним"""
+    if not await check_user_access(message.from_user.id):
+        await message.answer(Messages.ACCESS_DENIED_SHORT)
+        return
+    
+    catalog = await db.get_user_catalog(message.from_user.id)
+    if not catalog:
+        await message.answer(Messages.NO_SAVED_LINKS)
+        return
+    reviews = await db.get_user_latest_reviews(message.from_user.id, EXPORT_REVIEWS_PER_ARTICLE)
+    
+    # Названия колонок совпадают с теми, что понимает импорт, поэтому выгрузку можно загрузить обратно
+    catalog_header = ("article", "url", "root_id", "added_at", "last_review_date")
+    reviews_header = ("article", "review_id", "created_at", "rating", "text", "pros", "cons", "user_name")
+    caption = Messages.EXPORT_CAPTION.format(count=len(catalog))
+    
+    if EXPORT_FORMAT == "xlsx":
+        try:
+            data = write_xlsx({"Товары": (catalog_header, catalog), "Отзывы": (reviews_header, reviews)})
+        except CatalogFileError as e:
+            await message.answer(Messages.EXPORT_ERROR.format(error=e))
+            return
+        await message.answer_document(BufferedInputFile(data, filename="wb_catalog.xlsx"), caption=caption)
+    else:
+        await message.answer_document(
+            BufferedInputFile(write_csv(catalog_header, catalog), filename="wb_catalog.csv"), caption=caption
+        )
+        await message.answer_document(
+            BufferedInputFile(write_csv(reviews_header, reviews), filename="wb_reviews.csv")
+        )
 
 @router.message(StateFilter(LinkStates.adding_links))
-async def add_links_handler(message: Message, state: FSMContext):
-    if not check_user_access(message.from_user.id):
+async def add_links_handler(message: Message, state: FSMContext, parser: AsyncWildberriesReviewParser):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         await state.clear()
         return
     
     if message.text == ButtonTexts.BACK:
         await state.clear()
-        await message.answer(Messages.LINKS_MANAGEMENT.format(count=await db.get_urls_count()), reply_markup=get_links_keyboard())
+        await message.answer(await links_management_text(message.from_user.id), reply_markup=get_links_keyboard())
         return
     
     data = await state.get_data()
-    pending_links = data.get('pending_links', [])
-    
-    # Ищем все ссылки в тексте (могут быть разделены пробелами, переносами строк и т.д.)
-    import re
-    url_pattern = r'https://www\.wildberries\.ru/catalog/\d+/detail\.aspx'
-    found_urls = re.findall(url_pattern, message.text)
-    
-    valid_urls = []
-    parser = WildberriesReviewParser()
-    
-    # Получаем существующие артикулы из БД
-    existing_urls = await db.get_all_urls()
-    existing_articles = {article for article, _ in existing_urls}
-    
-    # Создаем множество для отслеживания уже обработанных артикулов в текущем сообщении
-    processed_articles = set()
-    
-    for url in found_urls:
-        article = parser.extract_article_from_url(url)
-        if article:
-            # Проверяем все возможные дубликаты:
-            # 1. Не существует в БД
-            # 2. Не добавлен в предыдущих сессиях (pending_links)
-            # 3. Не обработан в текущем сообщении
-            if (article not in existing_articles and 
-                not any(existing_article == article for existing_article, _ in pending_links) and
-                article not in processed_articles):
-                valid_urls.append((article, url))
-                processed_articles.add(article)
-    
-    if not valid_urls:
-        if found_urls:
-            await message.answer("Все найденные ссылки уже добавлены или некорректны.")
+    # В состоянии храним только артикулы: ссылка восстанавливается по PRODUCT_URL_TEMPLATE
+    pending_articles = data.get('pending_articles', [])
+    
+    # Артикулы из всех ссылок и чисел в тексте (с повторами, в порядке появления)
+    found_articles = parser.extract_articles(message.text or "")
+    if not found_articles:
+        await message.answer(Messages.NO_VALID_LINKS)
+        return
+    
+    # Один проход: каждый артикул либо новый, либо пропускается по первой подходящей причине.
+    # Сохраненные ищем в БД только среди найденных артикулов (article IN (...) по индексу)
+    existing_articles = await db.get_user_articles(message.from_user.id, set(found_articles))
+    pending_set = set(pending_articles)
+    new_articles = []
+    seen_in_message = set()
+    duplicates_in_db = duplicates_in_session = duplicates_in_message = 0
+    for article in found_articles:
+        if article in existing_articles:
+            duplicates_in_db += 1
+        elif article in pending_set:
+            duplicates_in_session += 1
+        elif article in seen_in_message:
+            duplicates_in_message += 1
         else:
-            await message.answer(Messages.NO_VALID_LINKS)
+            seen_in_message.add(article)
+            new_articles.append(article)
+    
+    if not new_articles:
+        await message.answer("Все найденные ссылки уже добавлены.")
         return
     
-    pending_links.extend(valid_urls)
-    await state.update_data(pending_links=pending_links)
+    # Проверяем существование товаров пачками запросов к API карточки и сразу запоминаем root ID
+    lookups = await parser.lookup_root_ids(new_articles)
+    missing_articles = [article for article in new_articles if lookups.get(article) is None]
+    unverified_articles = [article for article in new_articles if isinstance(lookups.get(article), BaseException)]
+    if missing_articles:
+        await message.answer(Messages.ARTICLES_NOT_FOUND.format(articles=articles_preview(missing_articles)))
+    if unverified_articles:
+        await message.answer(Messages.ARTICLES_NOT_VERIFIED.format(articles=articles_preview(unverified_articles)))
+    
+    missing_set = set(missing_articles)
+    new_articles = [article for article in new_articles if article not in missing_set]
+    
+    # Информируем о пропущенных ссылках
+    skip_reasons = []
+    if duplicates_in_db > 0:
+        skip_reasons.append(f"{duplicates_in_db} уже в БД")
+    if duplicates_in_session > 0:
+        skip_reasons.append(f"{duplicates_in_session} уже в сессии")
+    if duplicates_in_message > 0:
+        skip_reasons.append(f"{duplicates_in_message} дубликаты в сообщении")
+    if missing_articles:
+        skip_reasons.append(f"{len(missing_articles)} не найдены на Wildberries")
+    if skip_reasons:
+        skipped = len(found_articles) - len(new_articles)
+        await message.answer(
+            f"Найдено {len(found_articles)} ссылок, добавлено {len(new_articles)} новых. "
+            f"Пропущено {skipped} ({', '.join(skip_reasons)})."
+        )
+    if not new_articles:
+        return
     
-    # Информируем о найденных ссылках
-    if len(found_urls) > len(valid_urls):
-        skipped = len(found_urls) - len(valid_urls)
-        
-        # Подсчитываем типы пропущенных ссылок
-        duplicates_in_db = 0
-        duplicates_in_session = 0
-        duplicates_in_message = 0
-        
-        processed_in_message = set()
-        for url in found_urls:
-            article = parser.extract_article_from_url(url)
-            if article:
-                if article in existing_articles:
-                    duplicates_in_db += 1
-                elif any(existing_article == article for existing_article, _ in pending_links):
-                    duplicates_in_session += 1
-                elif article in processed_in_message:
-                    duplicates_in_message += 1
-                else:
-                    processed_in_message.add(article)
-        
-        skip_reasons = []
-        if duplicates_in_db > 0:
-            skip_reasons.append(f"{duplicates_in_db} уже в БД")
-        if duplicates_in_session > 0:
-            skip_reasons.append(f"{duplicates_in_session} уже в сессии")
-        if duplicates_in_message > 0:
-            skip_reasons.append(f"{duplicates_in_message} дубликаты в сообщении")
-        
-        reason_text = ", ".join(skip_reasons) if skip_reasons else "некорректные"
-        await message.answer(f"Найдено {len(found_urls)} ссылок, добавлено {len(valid_urls)} новых. Пропущено {skipped} ({reason_text}).")
+    pending_root_ids = data.get('pending_root_ids', {})
+    pending_root_ids.update({
+        article: root_id for article, root_id in lookups.items() if isinstance(root_id, str)
+    })
+    
+    pending_articles.extend(new_articles)
+    await state.update_data(pending_articles=pending_articles, pending_root_ids=pending_root_ids)
     
     # Проверяем лимит после добавления новых ссылок
-    current_count = await db.get_urls_count()
-    total_after_adding = current_count + len(pending_links)
+    current_count = await db.get_user_urls_count(message.from_user.id)
+    total_after_adding = current_count + len(pending_articles)
     
-    if total_after_adding > 30:
-        available = 30 - current_count
+    if total_after_adding > MAX_LINKS_PER_USER:
+        available = MAX_LINKS_PER_USER - current_count
         if available <= 0:
-            await message.answer(Messages.LINKS_LIMIT_REACHED)
+            await message.answer(Messages.LINKS_LIMIT_REACHED.format(limit=MAX_LINKS_PER_USER))
             return
         else:
             # Обрезаем список до доступного лимита
-            pending_links = pending_links[:available]
-            await state.update_data(pending_links=pending_links)
-            await message.answer(f"Можно добавить только {available} ссылок из {len(valid_urls)} найденных.")
+            pending_articles = pending_articles[:available]
+            await state.update_data(pending_articles=pending_articles)
+            await message.answer(f"Можно добавить только {available} ссылок из {len(new_articles)} найденных.")
     
-    articles = [article for article, _ in pending_links]
+    preview = "\n".join(f"{i+1}. {article}" for i, article in enumerate(pending_articles[:LINKS_PAGE_SIZE]))
+    if len(pending_articles) > LINKS_PAGE_SIZE:
+        preview += "\n" + Messages.AND_MORE.format(count=len(pending_articles) - LINKS_PAGE_SIZE)
     await message.answer(
-        Messages.CONFIRM_ADD_LINKS.format(count=len(pending_links)) + 
-        "\n".join(f"{i+1}. {article}" for i, article in enumerate(articles)),
+        Messages.CONFIRM_ADD_LINKS.format(count=len(pending_articles)) + preview,
         reply_markup=get_add_links_inline_keyboard()
     )
 
 @router.message(F.text == ButtonTexts.DELETE_LINK)
 async def delete_link_handler(message: Message, state: FSMContext):
-    if not check_user_access(message.from_user.id):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         return
     
-    urls = await db.get_all_urls()
-    if not urls:
+    text, keyboard = await render_links_page(message.from_user.id)
+    if text is None:
         await message.answer(Messages.NO_LINKS_TO_DELETE)
         return
     
-    response = Messages.DELETE_INSTRUCTIONS
-    for i, (article, _) in enumerate(urls, 1):
-        response += f"{i}. {article}\n"
-    
-    await message.answer(response, reply_markup=get_back_keyboard())
+    await message.answer(text, reply_markup=keyboard)
+    await message.answer(Messages.DELETE_INSTRUCTIONS, reply_markup=get_back_keyboard())
     await state.set_state(LinkStates.deleting_links)
-    await state.update_data(all_urls=urls)
 
 @router.message(StateFilter(LinkStates.deleting_links))
 async def delete_links_handler(message: Message, state: FSMContext):
-    if not check_user_access(message.from_user.id):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         await state.clear()
         return
     
     if message.text == ButtonTexts.BACK:
         await state.clear()
-        await message.answer(Messages.LINKS_MANAGEMENT.format(count=await db.get_urls_count()), reply_markup=get_links_keyboard())
+        await message.answer(await links_management_text(message.from_user.id), reply_markup=get_links_keyboard())
         return
     
-    data = await state.get_data()
-    all_urls = data.get('all_urls', [])
-    
     input_text = message.text.strip()
-    items = [item.strip() for item in input_text.split(',')]
+    items = [item.strip() for item in input_text.split(',') if item.strip()]
     
+    # Сначала ищем артикулы одним запросом, остальные числа считаем номерами в списке ссылок
+    user_articles = await db.get_user_articles(message.from_user.id, items)
     articles_to_delete = []
     
     for item in items:
-        if item.isdigit():
-            index = int(item) - 1
-            if 0 <= index < len(all_urls):
-                articles_to_delete.append(all_urls[index][0])
+        if item in user_articles:
+            article = item
+        elif item.isdigit():
+            article = await db.get_user_article_at(message.from_user.id, int(item))
         else:
-            for article, _ in all_urls:
-                if article == item:
-                    articles_to_delete.append(article)
-                    break
+            article = None
+        if article and article not in articles_to_delete:
+            articles_to_delete.append(article)
     
     if not articles_to_delete:
         await message.answer(Messages.NO_MATCHING_LINKS)
@@ -292,71 +542,97 @@ async def delete_links_handler(message: Message, state: FSMContext):
 
 @router.message(F.text == ButtonTexts.BACK)
 async def back_handler(message: Message, state: FSMContext):
-    if not check_user_access(message.from_user.id):
+    if not await check_user_access(message.from_user.id):
         await message.answer(Messages.ACCESS_DENIED_SHORT)
         return
     
     current_state = await state.get_state()
     await state.clear()
     
-    if current_state in [LinkStates.adding_links, LinkStates.deleting_links]:
-        await message.answer(Messages.LINKS_MANAGEMENT.format(count=await db.get_urls_count()), reply_markup=get_links_keyboard())
+    if current_state in [LinkStates.adding_links, LinkStates.deleting_links, LinkStates.searching_links]:
+        await message.answer(await links_management_text(message.from_user.id), reply_markup=get_links_keyboard())
     else:
         await message.answer(Messages.SETTINGS_MENU, reply_markup=get_settings_keyboard())
 
 # Callback handlers
 @router.callback_query(F.data == CallbackData.SAVE_LINKS)
-async def save_links_callback(callback: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    pending_links = data.get('pending_links', [])
+async def save_links_callback(callback: CallbackQuery, state: FSMContext, parser: AsyncWildberriesReviewParser):
+    if not await check_user_access(callback.from_user.id):
+        await callback.answer(Messages.ACCESS_DENIED_SHORT, show_alert=True)
+        return
     
-    saved_count = 0
-    for article, url in pending_links:
-        if await db.add_url(article, url):
-            saved_count += 1
+    data = await state.get_data()
+    pending_articles = data.get('pending_articles', [])
+    
+    # Root ID проверены при добавлении; довыясняем только те, что тогда получить не удалось,
+    # чтобы первый парсинг обошелся без запроса к API карточки
+    root_ids = data.get('pending_root_ids', {})
+    root_ids.update(await parser.resolve_root_ids(
+        article for article in pending_articles if article not in root_ids
+    ))
+    
+    saved_count = await db.add_user_urls(
+        callback.from_user.id,
+        (
+            (article, PRODUCT_URL_TEMPLATE.format(article=article), root_ids.get(article))
+            for article in pending_articles
+        ),
+        MAX_LINKS_PER_USER
+    )
     
     await state.clear()
     await callback.message.edit_text(Messages.LINKS_SAVED.format(count=saved_count))
-    await callback.message.answer(Messages.LINKS_MANAGEMENT.format(count=await db.get_urls_count()), reply_markup=get_links_keyboard())
+    await callback.message.answer(await links_management_text(callback.from_user.id), reply_markup=get_links_keyboard())
     await callback.answer()
 
 @router.callback_query(F.data == CallbackData.ADD_MORE_LINKS)
 async def add_more_links_callback(callback: CallbackQuery, state: FSMContext):
+    if not await check_user_access(callback.from_user.id):
+        await callback.answer(Messages.ACCESS_DENIED_SHORT, show_alert=True)
+        return
+    
     await callback.message.edit_text(Messages.SEND_MORE_LINKS)
     await callback.answer()
 
 @router.callback_query(F.data == CallbackData.CANCEL_LINKS)
 async def cancel_links_callback(callback: CallbackQuery, state: FSMContext):
+    if not await check_user_access(callback.from_user.id):
+        await callback.answer(Messages.ACCESS_DENIED_SHORT, show_alert=True)
+        return
+    
     await state.clear()
     await callback.message.edit_text(Messages.OPERATION_CANCELLED)
-    await callback.message.answer(Messages.LINKS_MANAGEMENT.format(count=await db.get_urls_count()), reply_markup=get_links_keyboard())
+    await callback.message.answer(await links_management_text(callback.from_user.id), reply_markup=get_links_keyboard())
     await callback.answer()
 
 @router.callback_query(F.data == CallbackData.CONFIRM_DELETE)
 async def confirm_delete_callback(callback: CallbackQuery, state: FSMContext):
+    if not await check_user_access(callback.from_user.id):
+        await callback.answer(Messages.ACCESS_DENIED_SHORT, show_alert=True)
+        return
+    
     data = await state.get_data()
     articles_to_delete = data.get('articles_to_delete', [])
     
-    deleted_count = await db.delete_by_articles(articles_to_delete)
+    deleted_count = await db.delete_user_articles(callback.from_user.id, articles_to_delete)
     
     await state.clear()
     await callback.message.edit_text(Messages.LINKS_DELETED.format(count=deleted_count))
-    await callback.message.answer(Messages.LINKS_MANAGEMENT.format(count=await db.get_urls_count()), reply_markup=get_links_keyboard())
+    await callback.message.answer(await links_management_text(callback.from_user.id), reply_markup=get_links_keyboard())
     await callback.answer()
 
 @router.callback_query(F.data == CallbackData.CANCEL_DELETE)
 async def cancel_delete_callback(callback: CallbackQuery, state: FSMContext):
+    if not await check_user_access(callback.from_user.id):
+        await callback.answer(Messages.ACCESS_DENIED_SHORT, show_alert=True)
+        return
+    
     await state.clear()
     await callback.message.edit_text(Messages.DELETE_CANCELLED)
-    await callback.message.answer(Messages.LINKS_MANAGEMENT.format(count=await db.get_urls_count()), reply_markup=get_links_keyboard())
+    await callback.message.answer(await links_management_text(callback.from_user.id), reply_markup=get_links_keyboard())
     await callback.answer()
 
 # Utility functions
-async def parse_reviews_async(parser, url):
-    import asyncio
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, parse_reviews_sync, parser, url)
-
 def parse_reviews_sync(parser, url):
     article = parser.extract_article_from_url(url)
     if not article:
@@ -370,15 +646,7 @@ def parse_reviews_sync(parser, url):
     if not data:
         return []
     
-    reviews = data.get('feedbacks', [])
-    if not reviews:
-        return []
-    
-    reviews_with_content = parser.filter_reviews_with_content(reviews)
-    latest_reviews = parser.get_latest_reviews(reviews_with_content)
-    low_rating_reviews = parser.filter_low_rating_reviews(latest_reviews)
-    
-    return low_rating_reviews
+    return parser.process_reviews(data)
 
 def format_article_reviews_response(article, reviews):
     if not reviews or reviews is None:
@@ -5,6 +5,7 @@ def get_main_keyboard():
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text=ButtonTexts.PARSE_REVIEWS)],
+            [KeyboardButton(text=ButtonTexts.PARSE_NEW_REVIEWS)],
             [KeyboardButton(text=ButtonTexts.SETTINGS)]
         ],
         resize_keyboard=True
@@ -27,6 +28,8 @@ def get_links_keyboard():
             [KeyboardButton(text=ButtonTexts.ADD_LINK)],
             [KeyboardButton(text=ButtonTexts.DELETE_LINK)],
             [KeyboardButton(text=ButtonTexts.SHOW_ALL_LINKS)],
+            [KeyboardButton(text=ButtonTexts.SEARCH_LINKS)],
+            [KeyboardButton(text=ButtonTexts.EXPORT_LINKS)],
             [KeyboardButton(text=ButtonTexts.BACK)]
         ],
         resize_keyboard=True
@@ -63,4 +66,19 @@ def get_delete_confirmation_keyboard():
             ]
         ]
     )
-    return keyboard
\ No newline at end of file
+    return keyboard
+
+def get_links_page_keyboard(offset: int, first: str, last: str, has_prev: bool, has_next: bool, query: str = ""):
+    """Кнопки листания списка ссылок; None, если листать некуда"""
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton(
+            text="◀️ Назад", callback_data=f"{CallbackData.LINKS_PAGE}:p:{offset}:{first}:{query}"
+        ))
+    if has_next:
+        buttons.append(InlineKeyboardButton(
+            text="Вперед ▶️", callback_data=f"{CallbackData.LINKS_PAGE}:n:{offset}:{last}:{query}"
+        ))
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
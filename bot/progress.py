@@ -0,0 +1,70 @@
+import logging
+import time
+from typing import Optional
+
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Message
+
+from config.settings import PROGRESS_UPDATE_INTERVAL
+from bot.enums import Messages
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressMessage:
+    """
+    Одно сообщение о ходе парсинга, которое редактируется на месте: сколько товаров
+    обработано, сколько ошибок и примерное оставшееся время. Правки не чаще одной
+    в PROGRESS_UPDATE_INTERVAL секунд, чтобы не упираться в лимиты Telegram.
+    """
+    
+    def __init__(self, title: str, total: int, interval: float = PROGRESS_UPDATE_INTERVAL):
+        self.title = title
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self._message: Optional[Message] = None
+        self._text = ""
+        self._started_at = time.monotonic()
+        self._updated_at = 0.0
+    
+    async def start(self, message: Message):
+        self._started_at = time.monotonic()
+        self._text = self._render()
+        self._message = await message.answer(self._text)
+        self._updated_at = time.monotonic()
+    
+    async def advance(self, count: int = 1, failed: bool = False):
+        self.done += count
+        if failed:
+            self.errors += count
+        if time.monotonic() - self._updated_at >= self.interval:
+            await self._edit(self._render())
+    
+    async def finish(self):
+        elapsed = time.monotonic() - self._started_at
+        await self._edit(self.title + "\n" + Messages.PROGRESS_DONE.format(
+            done=self.done, total=self.total, errors=self.errors, elapsed=f"{elapsed:.1f}"
+        ))
+    
+    def _render(self) -> str:
+        if not self.done or self.done >= self.total:
+            eta = "?" if not self.done else "0"
+        else:
+            elapsed = time.monotonic() - self._started_at
+            eta = f"{elapsed / self.done * (self.total - self.done):.0f}"
+        return self.title + "\n" + Messages.PROGRESS.format(
+            done=self.done, total=self.total, errors=self.errors, eta=eta
+        )
+    
+    async def _edit(self, text: str):
+        if self._message is None or text == self._text:
+            return
+        self._updated_at = time.monotonic()
+        try:
+            await self._message.edit_text(text)
+            self._text = text
+        except TelegramAPIError as e:
+            # Прогресс второстепенен: при флуд-лимите или ошибке просто пропускаем обновление
+            logger.warning(f"Не удалось обновить сообщение о прогрессе: {e}")
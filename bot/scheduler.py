@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import random
+from typing import Dict, List, Optional
+
+from config.settings import (
+    MONITOR_INTERVAL,
+    MONITOR_JITTER,
+    MONITOR_STAGGER_FRACTION,
+    ROOT_ID_CACHE_TTL
+)
+from src.parser import AsyncWildberriesReviewParser
+from src.monitoring import ArticleGroup, resolve_article_groups, parse_article_group
+from bot.handlers import format_article_reviews_response
+from bot.send_queue import SendQueue
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewScheduler:
+    """
+    Периодически проверяет сохраненные товары и присылает подписчикам уведомления о новых
+    отзывах с низкой оценкой. Товар, на который подписаны несколько пользователей,
+    и варианты одного товара (общий root ID) запрашиваются один раз за цикл.
+    """
+    
+    def __init__(self, send_queue: SendQueue, db, parser: AsyncWildberriesReviewParser,
+                 interval: float = MONITOR_INTERVAL, jitter: float = MONITOR_JITTER):
+        self.send_queue = send_queue
+        self.db = db
+        self.parser = parser
+        self.interval = interval
+        self.jitter = jitter
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Мониторинг отзывов запущен, интервал {self.interval} с")
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started_at = loop.time()
+            try:
+                await self.run_cycle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка цикла мониторинга: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started_at)))
+    
+    async def run_cycle(self):
+        """Проверяет все товары, разнося их старты по первой части интервала со случайным сдвигом"""
+        subscribers = await self.db.get_subscribers()
+        urls = [
+            (article, url, root_id)
+            for article, url, root_id in await self.db.get_urls_with_root_ids(ROOT_ID_CACHE_TTL)
+            if article in subscribers
+        ]
+        if not urls:
+            return
+        
+        groups = await resolve_article_groups(self.db, self.parser, urls)
+        marks = await self.db.get_review_marks()
+        step = self.interval * MONITOR_STAGGER_FRACTION / len(groups)
+        
+        await asyncio.gather(*(
+            self._check_group(i * step + random.uniform(0, self.jitter), group, marks, subscribers)
+            for i, group in enumerate(groups)
+        ))
+    
+    async def _check_group(self, delay: float, group: ArticleGroup, marks: Dict[str, str],
+                           subscribers: Dict[str, List[int]]):
+        await asyncio.sleep(delay)
+        since = group.since(marks)
+        result = await parse_article_group(self.db, self.parser, group, since)
+        if isinstance(result, BaseException):
+            logger.error(f"Ошибка мониторинга {group.label}: {result}")
+            return
+        
+        if result.newest_date:
+            group_marks = {article: (result.newest_date, result.newest_id) for article in group.articles}
+            await self.db.update_review_marks(group_marks)
+            await self.db.update_subscription_marks(group_marks)
+        
+        # Первая проверка товара только запоминает метку, чтобы не присылать старые отзывы
+        if not (since and result.reviews):
+            return
+        
+        # Каждый подписчик получает одно уведомление со своими артикулами из группы
+        user_articles: Dict[int, List[str]] = {}
+        for article in group.articles:
+            for user_id in subscribers.get(article, []):
+                user_articles.setdefault(user_id, []).append(article)
+        
+        for user_id, articles in user_articles.items():
+            self.send_queue.send(user_id, format_article_reviews_response(", ".join(articles), result.reviews))
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter
+
+from config.settings import (
+    TELEGRAM_MESSAGE_LIMIT,
+    SEND_QUEUE_RATE,
+    SEND_QUEUE_CHAT_INTERVAL,
+    SEND_QUEUE_GROUP_INTERVAL,
+    SEND_QUEUE_MAX_ATTEMPTS
+)
+from src.rate_limiter import AdaptiveTokenBucket, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+_SEPARATORS = ("\n\n", "\n", " ")
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT, separators: Tuple[str, ...] = _SEPARATORS) -> List[str]:
+    """
+    Делит текст на части не длиннее limit: сначала по абзацам, затем по строкам и словам,
+    и только слово длиннее limit режется посередине
+    """
+    if len(text) <= limit:
+        return [text] if text else []
+    if not separators:
+        return [text[i:i + limit] for i in range(0, len(text), limit)]
+
+    separator, rest = separators[0], separators[1:]
+    parts = []
+    current = ""
+    for block in text.split(separator):
+        for piece in split_message(block, limit, rest) if len(block) > limit else [block]:
+            if not current:
+                current = piece
+            elif len(current) + len(separator) + len(piece) <= limit:
+                current += separator + piece
+            else:
+                parts.append(current)
+                current = piece
+    if current:
+        parts.append(current)
+    return parts
+
+
+class SendQueue:
+    """
+    Очередь исходящих сообщений бота. Сообщения одного чата отправляются по порядку
+    не чаще раза в SEND_QUEUE_CHAT_INTERVAL секунд (в группах - SEND_QUEUE_GROUP_INTERVAL);
+    все, что накопилось за паузу, упаковывается в сообщения до TELEGRAM_MESSAGE_LIMIT символов.
+    Общая скорость бота ограничена SEND_QUEUE_RATE сообщений в секунду, при RetryAfter
+    отправка повторяется после указанной Telegram паузы.
+    """
+    
+    def __init__(self, bot: Bot, rate: float = SEND_QUEUE_RATE, limit: int = TELEGRAM_MESSAGE_LIMIT):
+        self.bot = bot
+        self.limit = limit
+        self._bucket = AdaptiveTokenBucket(rate, capacity=rate, min_rate=rate, max_rate=rate)
+        self._pending: Dict[int, Deque[Tuple[str, Optional[object]]]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+    
+    def send(self, chat_id: int, text: str, reply_markup=None):
+        """Ставит сообщение в очередь чата; слишком длинный текст делится на части"""
+        parts = split_message(text.strip(), self.limit)
+        if not parts:
+            return
+        items = self._pending.setdefault(chat_id, deque())
+        items.extend((part, None) for part in parts[:-1])
+        items.append((parts[-1], reply_markup))
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._work(chat_id))
+    
+    async def join(self, chat_id: Optional[int] = None):
+        """Ждет отправки всего, что стоит в очереди чата (или всех чатов)"""
+        tasks = list(self._workers.values()) if chat_id is None else [self._workers.get(chat_id)]
+        for task in tasks:
+            if task is not None:
+                await asyncio.shield(task)
+    
+    async def close(self, timeout: float = 10):
+        """Дожидается отправки очереди (не дольше timeout секунд) и останавливает отправку"""
+        tasks = list(self._workers.values())
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Не отправлены сообщения в {len(pending)} чатов: очередь остановлена")
+    
+    def _pack(self, items: Deque[Tuple[str, Optional[object]]]) -> Tuple[str, Optional[object]]:
+        # Клавиатура относится к последнему сообщению пачки, поэтому пачка на ней заканчивается
+        text, reply_markup = items.popleft()
+        while items and reply_markup is None and len(text) + 2 + len(items[0][0]) <= self.limit:
+            next_text, reply_markup = items.popleft()
+            text += "\n\n" + next_text
+        return text, reply_markup
+    
+    async def _work(self, chat_id: int):
+        interval = SEND_QUEUE_GROUP_INTERVAL if chat_id < 0 else SEND_QUEUE_CHAT_INTERVAL
+        items = self._pending[chat_id]
+        try:
+            # Даем накопиться сообщениям, поставленным в ту же итерацию цикла событий
+            await asyncio.sleep(0)
+            while items:
+                text, reply_markup = self._pack(items)
+                await self._deliver(chat_id, text, reply_markup)
+                # Воркер живет еще interval после отправки: новые сообщения ждут паузу и пакуются
+                await asyncio.sleep(interval)
+        finally:
+            del self._workers[chat_id]
+            if not items:
+                del self._pending[chat_id]
+    
+    async def _deliver(self, chat_id: int, text: str, reply_markup):
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id, text, reply_markup=reply_markup)
+                return
+            except TelegramRetryAfter as e:
+                logger.warning(f"Флуд-контроль Telegram для чата {chat_id}, пауза {e.retry_after} с")
+                await asyncio.sleep(e.retry_after)
+            except TelegramNetworkError as e:
+                attempt += 1
+                if attempt >= SEND_QUEUE_MAX_ATTEMPTS:
+                    logger.error(f"Сообщение в чат {chat_id} не отправлено: {e}")
+                    return
+                await asyncio.sleep(backoff_delay(attempt))
+            except TelegramAPIError as e:
+                # Бот заблокирован, чат не найден и т.п. - повтор не поможет
+                logger.error(f"Сообщение в чат {chat_id} не отправлено: {e}")
+                return
@@ -0,0 +1,90 @@
+import json
+import zlib
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config.settings import FSM_STORAGE, FSM_REDIS_URL, FSM_COMPRESS_MIN_BYTES
+from db.database import Database
+
+# Первый байт сериализованных данных: как записано остальное
+_PLAIN = b"j"
+_ZLIB = b"z"
+
+
+def dump_data(data: Dict[str, Any], compress_min_bytes: int = FSM_COMPRESS_MIN_BYTES) -> Optional[bytes]:
+    """
+    Компактная сериализация данных FSM: JSON без пробелов, а при размере от
+    compress_min_bytes - еще и zlib. Пустые данные не хранятся (None).
+    """
+    if not data:
+        return None
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+    if len(raw) >= compress_min_bytes:
+        return _ZLIB + zlib.compress(raw)
+    return _PLAIN + raw
+
+
+def load_data(value: Optional[bytes]) -> Dict[str, Any]:
+    if not value:
+        return {}
+    value = bytes(value)
+    raw = zlib.decompress(value[1:]) if value[:1] == _ZLIB else value[1:]
+    return json.loads(raw)
+
+
+def storage_key(key: StorageKey) -> str:
+    """Строковый ключ записи, как у RedisStorage: bot:chat:user[:thread]:destiny"""
+    parts = [str(key.bot_id), str(key.chat_id), str(key.user_id)]
+    if key.thread_id:
+        parts.append(str(key.thread_id))
+    parts.append(key.destiny)
+    return ":".join(parts)
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Хранилище FSM в таблице fsm_states базы бота: незавершенные диалоги переживают
+    перезапуск и видны всем процессам, работающим с одной базой
+    """
+    
+    def __init__(self, db: Database):
+        self.db = db
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self.db.set_fsm_state(storage_key(key), state.state if isinstance(state, State) else state)
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self.db.get_fsm_record(storage_key(key))
+        return state
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self.db.set_fsm_data(storage_key(key), dump_data(data))
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self.db.get_fsm_record(storage_key(key))
+        return load_data(data)
+    
+    async def close(self) -> None:
+        # Соединение с базой общее и закрывается в BotManager.on_shutdown
+        pass
+
+
+def create_fsm_storage(db: Database, backend: str = FSM_STORAGE) -> BaseStorage:
+    """
+    Хранилище FSM по настройке FSM_STORAGE: sqlite (по умолчанию), memory или redis.
+    Для redis (и совместимых серверов) нужен пакет redis.
+    """
+    if backend == "sqlite":
+        return SQLiteStorage(db)
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise RuntimeError("Для FSM_STORAGE=redis установите пакет redis: pip install redis") from e
+        return RedisStorage.from_url(FSM_REDIS_URL)
+    raise ValueError(f"Неизвестное хранилище FSM: {backend}")
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик webhook: сразу отвечает Telegram, а апдейт кладет во внутреннюю очередь,
+    которую разбирают workers воркеров. Если очередь заполнена, отвечает 503 -
+    Telegram повторит доставку позже.
+    """
+    
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, workers: int, queue_size: int,
+                 secret_token: Optional[str] = None, **data: Any):
+        super().__init__(dispatcher, bot, secret_token=secret_token, **data)
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+        self._worker_tasks: List[asyncio.Task] = []
+    
+    async def start_workers(self, app: web.Application):
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._worker_tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        logger.info(f"Запущено {self.workers} воркеров обработки апдейтов")
+    
+    async def stop_workers(self, app: web.Application, timeout: float = 10):
+        """Дожидается обработки уже принятых апдейтов (не дольше timeout) и останавливает воркеров"""
+        if self._queue is not None and not self._queue.empty():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Не обработано апдейтов: {self._queue.qsize()}")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        # Только публичные методы SimpleRequestHandler и Dispatcher: внутренние методы
+        # фоновой обработки aiogram могут измениться при обновлении
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot):
+            return web.Response(body="Unauthorized", status=401)
+        update: Dict[str, Any] = await request.json(loads=bot.session.json_loads)
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning("Очередь апдейтов заполнена, просим Telegram повторить позже")
+            return web.Response(status=503)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+    
+    __call__ = handle
+    
+    async def _work(self):
+        while True:
+            update = await self._queue.get()
+            try:
+                result = await self.dispatcher.feed_raw_update(self.bot, update, **self.data)
+                # Ответ обработчика в виде метода API (как ответ на webhook) отправляем запросом
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(self.bot, result)
+            except Exception as e:
+                logger.error(f"Ошибка обработки апдейта {update.get('update_id')}: {e}")
+            finally:
+                self._queue.task_done()
@@ -8,19 +8,89 @@ MAX_VALUATION = 3
 
 # URL товара для парсинга (пример)
 PRODUCT_URL = "https://www.wildberries.ru/catalog/44587938/detail.aspx"
+# Каноническая ссылка на товар по артикулу
+PRODUCT_URL_TEMPLATE = "https://www.wildberries.ru/catalog/{article}/detail.aspx"
 
 # Базовый URL для API карточки товара
 CARD_API_BASE_URL = "https://card.wb.ru/cards/v2/detail?appType=1&curr=rub&dest=-59202&spp=30&ab_testing=false&nm="
+# Сколько артикулов запрашивать у API карточки за один запрос (nm=1;2;3)
+CARD_BATCH_SIZE = 50
 
 # Базовый URL для API отзывов
 FEEDBACKS_API_BASE_URL = "https://feedbacks1.wb.ru/feedbacks/v2/"
 
+# Зеркала API отзывов (асинхронный парсер): запрос уходит на самое быстрое исправное зеркало,
+# при ошибке - на следующее
+FEEDBACKS_API_MIRRORS = [
+    FEEDBACKS_API_BASE_URL,
+    "https://feedbacks2.wb.ru/feedbacks/v2/",
+]
+# Сглаживание EWMA задержки и доли ошибок зеркал
+MIRROR_EWMA_ALPHA = 0.2
+# Оценка зеркала: задержка * (1 + MIRROR_ERROR_PENALTY * доля ошибок)
+MIRROR_ERROR_PENALTY = 5
+# Доля запросов, отправляемых на второе по оценке зеркало, чтобы его оценка не устаревала
+MIRROR_EXPLORE_RATE = 0.05
+# Хеджирование: если зеркало не ответило за HEDGE_DELAY_FACTOR * его средняя задержка
+# (но не меньше HEDGE_MIN_DELAY секунд), тот же запрос дублируется на следующее зеркало
+HEDGE_ENABLED = True
+HEDGE_DELAY_FACTOR = 3
+HEDGE_MIN_DELAY = 0.3
+
+# Одновременные запросы одного товара (root ID или артикула) объединяются в один,
+# а результат еще столько секунд отдается из памяти без запроса к WB
+PARSE_RESULT_CACHE_TTL = 30
+# Для скольких товаров помнить ETag, хэш и последний результат разбора отзывов (условные запросы);
+# при переполнении вытесняются товары, которые дольше всех не запрашивались
+FEEDBACKS_CACHE_MAX_ENTRIES = 10_000
+
 # Настройки запросов
 REQUEST_TIMEOUT = 10
 REQUEST_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
+# Максимальное количество одновременных запросов к API Wildberries
+PARSER_CONCURRENCY = 10
+# Размер пула соединений общего HTTP-клиента парсера
+PARSER_POOL_SIZE = 20
+# Сколько секунд держать простаивающее соединение открытым (keep-alive)
+PARSER_KEEPALIVE_TIMEOUT = 60
+
+# Ограничение частоты запросов к каждому хосту WB (token bucket, запросов в секунду).
+# Скорость подстраивается: на 429 уменьшается вдвое, на успешных ответах растет до максимума
+RATE_LIMIT_RPS = 10
+RATE_LIMIT_MIN_RPS = 0.5
+RATE_LIMIT_MAX_RPS = 30
+RATE_LIMIT_BURST = 10
+
+# Повторы запросов при 429/5xx и сетевых ошибках (экспоненциальная задержка со случайным разбросом)
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30
+
+# Circuit breaker: хост отключается на CIRCUIT_BREAKER_OPEN_SECONDS, если среди последних
+# CIRCUIT_BREAKER_WINDOW запросов (но не менее CIRCUIT_BREAKER_MIN_CALLS) доля ошибок выше порога
+CIRCUIT_BREAKER_WINDOW = 20
+CIRCUIT_BREAKER_MIN_CALLS = 10
+CIRCUIT_BREAKER_FAILURE_RATIO = 0.5
+CIRCUIT_BREAKER_OPEN_SECONDS = 60
+
+# Ответы API отзывов от этого размера (или без Content-Length) разбираются потоково (байты)
+STREAM_DECODE_MIN_BYTES = 256 * 1024
+# Размер части при потоковом чтении ответа (байты)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Сколько строк истории отзывов накапливать перед записью в БД при потоковом разборе
+HISTORY_BATCH_SIZE = 1000
+
+# Время жизни закэшированного root ID товара (секунды)
+ROOT_ID_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Настройки SQLite: размер кэша страниц (КБ) и ожидание блокировки (мс)
+DB_CACHE_SIZE_KB = 16 * 1024
+DB_BUSY_TIMEOUT_MS = 5000
+
 # Настройки Telegram бота
 import os
 from dotenv import load_dotenv
@@ -28,4 +98,59 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-TELEGRAM_USER_ID = int(os.getenv("TELEGRAM_USER_ID", 0))
\ No newline at end of file
+# Администратор бота: управляет пользователями командами /adduser, /deluser, /users
+TELEGRAM_USER_ID = int(os.getenv("TELEGRAM_USER_ID", 0))
+# Пользователи, которым доступ выдается при запуске (через запятую)
+TELEGRAM_USER_IDS = [int(user_id) for user_id in os.getenv("TELEGRAM_USER_IDS", "").replace(" ", "").split(",") if user_id]
+# Максимальное количество отслеживаемых товаров у одного пользователя
+MAX_LINKS_PER_USER = int(os.getenv("MAX_LINKS_PER_USER", 1000))
+# Сколько товаров показывать на одной странице списка ссылок
+LINKS_PAGE_SIZE = 20
+# Импорт товаров из файла (CSV, XLSX, TXT): максимальный размер файла (байты)
+IMPORT_MAX_FILE_SIZE = 5 * 1024 * 1024
+# Формат выгрузки товаров и отзывов: "csv" или "xlsx" (нужен пакет openpyxl)
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "csv").lower()
+# Сколько последних сохраненных отзывов каждого товара попадает в выгрузку
+EXPORT_REVIEWS_PER_ARTICLE = 20
+# Как часто (секунды) обновлять сообщение о ходе парсинга
+PROGRESS_UPDATE_INTERVAL = 3
+
+# Очередь исходящих сообщений: максимальная длина сообщения Telegram,
+# общая скорость отправки (лимит Telegram - около 30 сообщений в секунду)
+# и пауза между сообщениями в один личный чат / группу (секунды)
+TELEGRAM_MESSAGE_LIMIT = 4096
+SEND_QUEUE_RATE = 25
+SEND_QUEUE_CHAT_INTERVAL = 1.0
+SEND_QUEUE_GROUP_INTERVAL = 3.0
+# Сколько раз пытаться отправить сообщение при сетевых ошибках
+SEND_QUEUE_MAX_ATTEMPTS = 5
+
+# Хранилище состояний диалогов (FSM): "sqlite" - в базе бота, переживает перезапуск;
+# "memory" - в памяти процесса; "redis" - Redis или совместимый сервер по FSM_REDIS_URL
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlite").lower()
+FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0")
+# Данные состояния от такого размера (байт) сжимаются zlib
+FSM_COMPRESS_MIN_BYTES = 512
+
+# Способ получения обновлений: "polling" (long polling) или "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Webhook: публичный адрес (https://bot.example.com), путь и секрет, которым Telegram
+# подписывает запросы (заголовок X-Telegram-Bot-Api-Secret-Token)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+# Адрес, на котором слушает встроенный HTTP-сервер (за reverse proxy)
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+# Сколько апдейтов обрабатывается одновременно и сколько может ждать в очереди
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 8))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))
+
+# Настройки фонового мониторинга отзывов
+MONITOR_ENABLED = os.getenv("MONITOR_ENABLED", "1") == "1"
+# Интервал между проверками всех товаров (секунды)
+MONITOR_INTERVAL = int(os.getenv("MONITOR_INTERVAL", 15 * 60))
+# Доля интервала, по которой равномерно разносятся старты проверок товаров
+MONITOR_STAGGER_FRACTION = 0.5
+# Максимальный случайный сдвиг старта проверки товара (секунды)
+MONITOR_JITTER = 30
\ No newline at end of file
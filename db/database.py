@@ -1,61 +1,556 @@
+import asyncio
 import aiosqlite
 import os
-from typing import List, Optional
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config.settings import DB_CACHE_SIZE_KB, DB_BUSY_TIMEOUT_MS
+from src.parser import review_timestamp_key
+
+# Сколько параметров передавать в один запрос с IN (...): старые сборки SQLite ограничены 999
+_SQL_VARIABLES_CHUNK = 500
+
+def _article_prefix_condition(prefix: str, column: str = "article") -> Tuple[str, list]:
+    # Поиск по началу артикула диапазоном [prefix, следующий за prefix), чтобы работал индекс
+    if not prefix:
+        return "", []
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return f" AND {column} >= ? AND {column} < ?", [prefix, upper]
+
+def _mark_advances(review_date: str, current_date: Optional[str]) -> bool:
+    # Даты сравниваются как моменты времени (дробные секунды, смещения), а не как строки
+    return current_date is None or review_timestamp_key(current_date) < review_timestamp_key(review_date)
 
 class Database:
     def __init__(self, db_path: str = "db/database.db"):
         self.db_path = db_path
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # Одно соединение на все время работы (у каждого соединения aiosqlite свой поток)
+        self._conn: Optional[aiosqlite.Connection] = None
+        # Блокировки создаются лениво, внутри работающего event loop
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+    
+    async def _connection(self) -> aiosqlite.Connection:
+        if self._conn is None:
+            if self._connect_lock is None:
+                self._connect_lock = asyncio.Lock()
+            async with self._connect_lock:
+                if self._conn is None:
+                    conn = await aiosqlite.connect(self.db_path)
+                    await conn.execute("PRAGMA journal_mode=WAL")
+                    await conn.execute("PRAGMA synchronous=NORMAL")
+                    await conn.execute("PRAGMA temp_store=MEMORY")
+                    await conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+                    await conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+                    self._conn = conn
+        return self._conn
+    
+    @asynccontextmanager
+    async def _transaction(self):
+        conn = await self._connection()
+        # Транзакции на общем соединении выполняются по очереди
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            await conn.commit()
+    
+    async def _fetchall(self, query: str, params: Iterable = ()) -> List[tuple]:
+        conn = await self._connection()
+        async with conn.execute(query, params) as cursor:
+            return await cursor.fetchall()
+    
+    async def _fetchone(self, query: str, params: Iterable = ()) -> Optional[tuple]:
+        conn = await self._connection()
+        async with conn.execute(query, params) as cursor:
+            return await cursor.fetchone()
+    
+    async def close(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
     
-    async def init_db(self):
-        async with aiosqlite.connect(self.db_path) as db:
+    async def init_db(self, owner_id: Optional[int] = None):
+        """
+        Создает таблицы и выполняет миграции. owner_id - администратор бота; при первом
+        запуске после перехода на несколько пользователей ему достаются все сохраненные товары.
+        """
+        async with self._transaction() as db:
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS product_urls (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     article TEXT UNIQUE NOT NULL,
                     url TEXT NOT NULL,
+                    root_id TEXT,
+                    root_id_updated_at TIMESTAMP,
+                    last_review_date TEXT,
+                    last_review_id TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            await db.commit()
-    
-    async def add_url(self, article: str, url: str) -> bool:
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Используем INSERT OR IGNORE чтобы не перезаписывать существующие записи
-                cursor = await db.execute(
-                    "INSERT OR IGNORE INTO product_urls (article, url) VALUES (?, ?)",
-                    (article, url)
+            await self._add_missing_columns(db, "product_urls", {
+                "root_id": "TEXT",
+                "root_id_updated_at": "TIMESTAMP",
+                "last_review_date": "TEXT",
+                "last_review_id": "TEXT",
+            })
+            # История отзывов: id отзыва WB -> последняя известная версия. Отзывы общие
+            # для всех вариантов товара, поэтому хранятся по root ID, а не по артикулу
+            legacy_reviews = await self._rename_legacy_reviews(db)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS reviews (
+                    id TEXT PRIMARY KEY,
+                    root_id TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    rating INTEGER,
+                    text TEXT,
+                    pros TEXT,
+                    cons TEXT,
+                    user_name TEXT,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reviews_root_created ON reviews (root_id, created_at)"
+            )
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reviews_root_rating ON reviews (root_id, rating)"
+            )
+            if legacy_reviews:
+                await db.execute(
+                    """
+                    INSERT INTO reviews (id, root_id, created_at, rating, text, pros, cons, user_name, fetched_at)
+                    SELECT id, root_id, created_at, rating, text, pros, cons, user_name, fetched_at
+                    FROM reviews_by_article WHERE root_id IS NOT NULL
+                    """
+                )
+                await db.execute("DROP TABLE reviews_by_article")
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id INTEGER PRIMARY KEY,
+                    is_admin INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Подписки пользователей на товары; метки отзывов - для ручного поиска новых отзывов
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS subscriptions (
+                    user_id INTEGER NOT NULL,
+                    article TEXT NOT NULL,
+                    last_review_date TEXT,
+                    last_review_id TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, article)
+                )
+            """)
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_subscriptions_article ON subscriptions (article)"
+            )
+            # Состояния диалогов бота (FSM); data - сериализованные данные, см. bot/storage.py
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS fsm_states (
+                    key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data BLOB,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            if owner_id:
+                await self._add_users(db, [owner_id], is_admin=True)
+                # Товары из однопользовательской версии переходят к администратору
+                await db.execute(
+                    """
+                    INSERT OR IGNORE INTO subscriptions (user_id, article, last_review_date, last_review_id)
+                    SELECT ?, article, last_review_date, last_review_id FROM product_urls
+                    WHERE NOT EXISTS (SELECT 1 FROM subscriptions)
+                    """,
+                    (owner_id,)
                 )
-                await db.commit()
-                # Возвращаем True только если была добавлена новая запись
-                return cursor.rowcount > 0
-        except Exception:
+    
+    async def _rename_legacy_reviews(self, db) -> bool:
+        # Раньше история хранилась под первым артикулом группы вариантов (колонка article):
+        # такая таблица переименовывается, а отзывы переносятся в новую по root ID
+        cursor = await db.execute("PRAGMA table_info(reviews)")
+        if "article" not in {row[1] for row in await cursor.fetchall()}:
             return False
+        await db.execute("ALTER TABLE reviews RENAME TO reviews_by_article")
+        await db.execute("DROP INDEX IF EXISTS idx_reviews_article_created")
+        await db.execute("DROP INDEX IF EXISTS idx_reviews_article_rating")
+        return True
     
-    async def get_all_urls(self) -> List[tuple]:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT article, url FROM product_urls ORDER BY id")
-            return await cursor.fetchall()
+    async def _add_missing_columns(self, db, table: str, columns: Dict[str, str]):
+        # Миграция баз, созданных до появления новых колонок
+        cursor = await db.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in await cursor.fetchall()}
+        for name, column_type in columns.items():
+            if name not in existing:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
+    async def _add_users(self, db, user_ids: Iterable[int], is_admin: bool = False):
+        await db.executemany(
+            """
+            INSERT INTO users (user_id, is_admin) VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET is_admin = MAX(is_admin, excluded.is_admin)
+            """,
+            [(user_id, int(is_admin)) for user_id in user_ids]
+        )
+    
+    async def add_users(self, user_ids: Iterable[int], is_admin: bool = False):
+        """Добавляет пользователей; права администратора только добавляются, но не снимаются"""
+        async with self._transaction() as db:
+            await self._add_users(db, user_ids, is_admin)
+    
+    async def delete_user(self, user_id: int) -> bool:
+        """Удаляет пользователя вместе с его подписками"""
+        async with self._transaction() as db:
+            cursor = await db.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+            deleted = cursor.rowcount > 0
+            await db.execute("DELETE FROM subscriptions WHERE user_id = ?", (user_id,))
+            await self._delete_orphan_articles(db)
+            return deleted
     
-    async def delete_by_articles(self, articles: List[str]) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
-            placeholders = ",".join("?" * len(articles))
-            cursor = await db.execute(
-                f"DELETE FROM product_urls WHERE article IN ({placeholders})",
-                articles
+    async def get_users(self) -> List[tuple]:
+        """(user_id, is_admin, число подписок)"""
+        return await self._fetchall(
+            """
+            SELECT u.user_id, u.is_admin, COUNT(s.article)
+            FROM users u LEFT JOIN subscriptions s ON s.user_id = u.user_id
+            GROUP BY u.user_id ORDER BY u.created_at, u.user_id
+            """
+        )
+    
+    async def is_user(self, user_id: int) -> bool:
+        return await self._fetchone("SELECT 1 FROM users WHERE user_id = ?", (user_id,)) is not None
+    
+    async def is_admin(self, user_id: int) -> bool:
+        result = await self._fetchone("SELECT is_admin FROM users WHERE user_id = ?", (user_id,))
+        return bool(result and result[0])
+    
+    async def add_user_urls(self, user_id: int, rows: Iterable[Tuple[str, str, Optional[str]]],
+                            limit: int) -> int:
+        """
+        Подписывает пользователя на товары (article, url, root_id), добавляя новые товары
+        в общий каталог. Подписок у пользователя не больше limit; возвращает число новых подписок.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        async with self._transaction() as db:
+            cursor = await db.execute("SELECT COUNT(*) FROM subscriptions WHERE user_id = ?", (user_id,))
+            available = limit - (await cursor.fetchone())[0]
+            if available <= 0:
+                return 0
+            subscribed = set()
+            for start in range(0, len(rows), _SQL_VARIABLES_CHUNK):
+                chunk = [article for article, _, _ in rows[start:start + _SQL_VARIABLES_CHUNK]]
+                cursor = await db.execute(
+                    f"SELECT article FROM subscriptions WHERE user_id = ? AND article IN ({', '.join('?' * len(chunk))})",
+                    (user_id, *chunk)
+                )
+                subscribed.update(article for article, in await cursor.fetchall())
+            rows = [row for row in rows if row[0] not in subscribed][:available]
+            if not rows:
+                return 0
+            
+            await db.executemany(
+                """
+                INSERT OR IGNORE INTO product_urls (article, url, root_id, root_id_updated_at)
+                VALUES (?, ?, ?, CASE WHEN ? IS NULL THEN NULL ELSE CURRENT_TIMESTAMP END)
+                """,
+                [(article, url, root_id, root_id) for article, url, root_id in rows]
+            )
+            cursor = await db.executemany(
+                "INSERT OR IGNORE INTO subscriptions (user_id, article) VALUES (?, ?)",
+                [(user_id, article) for article, _, _ in rows]
             )
-            await db.commit()
             return cursor.rowcount
     
-    async def get_urls_count(self) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT COUNT(*) FROM product_urls")
-            result = await cursor.fetchone()
-            return result[0] if result else 0
-    
-    async def article_exists(self, article: str) -> bool:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT 1 FROM product_urls WHERE article = ?", (article,))
-            result = await cursor.fetchone()
-            return result is not None
\ No newline at end of file
+    async def delete_user_articles(self, user_id: int, articles: List[str]) -> int:
+        """Отписывает пользователя от товаров; товары без подписчиков удаляются из каталога"""
+        if not articles:
+            return 0
+        deleted_count = 0
+        async with self._transaction() as db:
+            for start in range(0, len(articles), _SQL_VARIABLES_CHUNK):
+                chunk = articles[start:start + _SQL_VARIABLES_CHUNK]
+                cursor = await db.execute(
+                    f"DELETE FROM subscriptions WHERE user_id = ? AND article IN ({', '.join('?' * len(chunk))})",
+                    (user_id, *chunk)
+                )
+                deleted_count += cursor.rowcount
+            await self._delete_orphan_articles(db)
+        return deleted_count
+    
+    async def _delete_orphan_articles(self, db):
+        await db.execute(
+            "DELETE FROM product_urls WHERE article NOT IN (SELECT article FROM subscriptions)"
+        )
+        await self._delete_orphan_reviews(db)
+    
+    async def _delete_orphan_reviews(self, db):
+        # Отзывы общие для вариантов товара: удаляются, когда в каталоге не осталось ни одного
+        await db.execute(
+            """
+            DELETE FROM reviews
+            WHERE root_id NOT IN (SELECT root_id FROM product_urls WHERE root_id IS NOT NULL)
+            """
+        )
+    
+    async def get_user_urls_with_root_ids(self, user_id: int, ttl_seconds: int) -> List[tuple]:
+        """Как get_urls_with_root_ids, но только товары пользователя"""
+        return await self._fetchall(
+            """
+            SELECT p.article, p.url,
+                   CASE WHEN p.root_id_updated_at >= datetime('now', ?) THEN p.root_id END
+            FROM subscriptions s JOIN product_urls p ON p.article = s.article
+            WHERE s.user_id = ? ORDER BY s.created_at, p.id
+            """,
+            (f"-{int(ttl_seconds)} seconds", user_id)
+        )
+    
+    async def get_user_urls_count(self, user_id: int, prefix: str = "") -> int:
+        """Количество товаров пользователя; prefix - только артикулы, начинающиеся с него"""
+        condition, params = _article_prefix_condition(prefix)
+        result = await self._fetchone(
+            f"SELECT COUNT(*) FROM subscriptions WHERE user_id = ?{condition}", (user_id, *params)
+        )
+        return result[0] if result else 0
+    
+    async def get_user_urls_page(self, user_id: int, limit: int, after: Optional[str] = None,
+                                 before: Optional[str] = None, prefix: str = "") -> List[tuple]:
+        """
+        Страница (article, url) товаров пользователя в порядке артикулов: limit записей
+        после артикула after или перед before (keyset-пагинация по первичному ключу подписок,
+        без OFFSET). prefix - поиск по началу артикула.
+        """
+        condition, params = _article_prefix_condition(prefix, column="s.article")
+        if after is not None:
+            condition += " AND s.article > ?"
+            params.append(after)
+        if before is not None:
+            condition += " AND s.article < ?"
+            params.append(before)
+        rows = await self._fetchall(
+            f"""
+            SELECT s.article, p.url
+            FROM subscriptions s JOIN product_urls p ON p.article = s.article
+            WHERE s.user_id = ?{condition}
+            ORDER BY s.article {"DESC" if before is not None else "ASC"} LIMIT ?
+            """,
+            (user_id, *params, limit)
+        )
+        return rows[::-1] if before is not None else rows
+    
+    async def get_user_catalog(self, user_id: int) -> List[tuple]:
+        """
+        Товары пользователя для выгрузки:
+        (article, url, root_id, дата подписки, дата последнего показанного отзыва)
+        """
+        return await self._fetchall(
+            """
+            SELECT s.article, p.url, p.root_id, s.created_at, s.last_review_date
+            FROM subscriptions s JOIN product_urls p ON p.article = s.article
+            WHERE s.user_id = ? ORDER BY s.article
+            """,
+            (user_id,)
+        )
+    
+    async def get_user_latest_reviews(self, user_id: int, per_article: int) -> List[tuple]:
+        """
+        Последние per_article сохраненных отзывов по каждому товару пользователя:
+        (article, id, created_at, rating, text, pros, cons, user_name)
+        """
+        return await self._fetchall(
+            """
+            SELECT article, id, created_at, rating, text, pros, cons, user_name FROM (
+                SELECT s.article, r.id, r.created_at, r.rating, r.text, r.pros, r.cons, r.user_name,
+                       ROW_NUMBER() OVER (PARTITION BY s.article ORDER BY r.created_at DESC) AS position
+                FROM subscriptions s
+                JOIN product_urls p ON p.article = s.article
+                JOIN reviews r ON r.root_id = p.root_id
+                WHERE s.user_id = ?
+            )
+            WHERE position <= ? ORDER BY article, created_at DESC
+            """,
+            (user_id, per_article)
+        )
+    
+    async def get_user_article_at(self, user_id: int, position: int) -> Optional[str]:
+        """Артикул по номеру (с 1) в списке товаров пользователя, упорядоченном по артикулу"""
+        if position < 1:
+            return None
+        result = await self._fetchone(
+            "SELECT article FROM subscriptions WHERE user_id = ? ORDER BY article LIMIT 1 OFFSET ?",
+            (user_id, position - 1)
+        )
+        return result[0] if result else None
+    
+    async def get_user_articles(self, user_id: int, articles: Iterable[str]) -> Set[str]:
+        """Какие из articles уже есть у пользователя"""
+        found: Set[str] = set()
+        articles = list(articles)
+        for start in range(0, len(articles), _SQL_VARIABLES_CHUNK):
+            chunk = articles[start:start + _SQL_VARIABLES_CHUNK]
+            rows = await self._fetchall(
+                f"SELECT article FROM subscriptions WHERE user_id = ? AND article IN ({', '.join('?' * len(chunk))})",
+                (user_id, *chunk)
+            )
+            found.update(article for article, in rows)
+        return found
+    
+    async def get_subscribers(self) -> Dict[str, List[int]]:
+        """Подписчики каждого товара: {article: [user_id, ...]}"""
+        subscribers: Dict[str, List[int]] = {}
+        for article, user_id in await self._fetchall("SELECT article, user_id FROM subscriptions"):
+            subscribers.setdefault(article, []).append(user_id)
+        return subscribers
+    
+    async def get_subscription_marks(self, user_id: int) -> Dict[str, str]:
+        """Дата самого свежего отзыва, показанного пользователю, по каждому его товару"""
+        return dict(await self._fetchall(
+            """
+            SELECT article, last_review_date FROM subscriptions
+            WHERE user_id = ? AND last_review_date IS NOT NULL
+            """,
+            (user_id,)
+        ))
+    
+    async def update_subscription_marks(self, marks: Dict[str, Tuple[str, Optional[str]]],
+                                        user_id: Optional[int] = None):
+        """
+        Сдвигает метки подписок вперед: одного пользователя или, если user_id не задан,
+        всех подписчиков товара
+        """
+        if not marks:
+            return
+        async with self._transaction() as db:
+            articles = list(marks)
+            updates = []
+            for start in range(0, len(articles), _SQL_VARIABLES_CHUNK):
+                chunk = articles[start:start + _SQL_VARIABLES_CHUNK]
+                cursor = await db.execute(
+                    f"""
+                    SELECT user_id, article, last_review_date FROM subscriptions
+                    WHERE (? IS NULL OR user_id = ?) AND article IN ({', '.join('?' * len(chunk))})
+                    """,
+                    (user_id, user_id, *chunk)
+                )
+                for subscriber, article, current_date in await cursor.fetchall():
+                    review_date, review_id = marks[article]
+                    if _mark_advances(review_date, current_date):
+                        updates.append((review_date, review_id, subscriber, article))
+            await db.executemany(
+                """
+                UPDATE subscriptions SET last_review_date = ?, last_review_id = ?
+                WHERE user_id = ? AND article = ?
+                """,
+                updates
+            )
+    
+    async def get_fsm_record(self, key: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """Состояние и сериализованные данные диалога; (None, None), если записи нет"""
+        result = await self._fetchone("SELECT state, data FROM fsm_states WHERE key = ?", (key,))
+        return result if result else (None, None)
+    
+    async def set_fsm_state(self, key: str, state: Optional[str]):
+        await self._set_fsm_column(key, "state", state)
+    
+    async def set_fsm_data(self, key: str, data: Optional[bytes]):
+        await self._set_fsm_column(key, "data", data)
+    
+    async def _set_fsm_column(self, key: str, column: str, value):
+        async with self._transaction() as db:
+            await db.execute(
+                f"""
+                INSERT INTO fsm_states (key, {column}) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column},
+                                               updated_at = CURRENT_TIMESTAMP
+                """,
+                (key, value)
+            )
+            # Завершенный диалог (без состояния и данных) не храним
+            await db.execute(
+                "DELETE FROM fsm_states WHERE key = ? AND state IS NULL AND data IS NULL", (key,)
+            )
+    
+    async def get_urls_with_root_ids(self, ttl_seconds: int) -> List[tuple]:
+        """Возвращает (article, url, root_id); root_id = None, если его нет в кэше или он устарел"""
+        return await self._fetchall(
+            """
+            SELECT article, url,
+                   CASE WHEN root_id_updated_at >= datetime('now', ?) THEN root_id END
+            FROM product_urls ORDER BY id
+            """,
+            (f"-{int(ttl_seconds)} seconds",)
+        )
+    
+    async def set_root_ids(self, root_ids: Dict[str, str]):
+        if not root_ids:
+            return
+        async with self._transaction() as db:
+            await db.executemany(
+                """
+                UPDATE product_urls SET root_id = ?, root_id_updated_at = CURRENT_TIMESTAMP
+                WHERE article = ?
+                """,
+                [(root_id, article) for article, root_id in root_ids.items()]
+            )
+    
+    async def get_review_marks(self) -> Dict[str, str]:
+        """Возвращает дату самого свежего просмотренного отзыва по каждому артикулу"""
+        return dict(await self._fetchall(
+            "SELECT article, last_review_date FROM product_urls WHERE last_review_date IS NOT NULL"
+        ))
+    
+    async def update_review_marks(self, marks: Dict[str, Tuple[str, Optional[str]]]):
+        """Сдвигает метки (дата, id отзыва) вперед; более старые даты игнорируются"""
+        if not marks:
+            return
+        async with self._transaction() as db:
+            articles = list(marks)
+            updates = []
+            for start in range(0, len(articles), _SQL_VARIABLES_CHUNK):
+                chunk = articles[start:start + _SQL_VARIABLES_CHUNK]
+                cursor = await db.execute(
+                    f"SELECT article, last_review_date FROM product_urls WHERE article IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                )
+                for article, current_date in await cursor.fetchall():
+                    review_date, review_id = marks[article]
+                    if _mark_advances(review_date, current_date):
+                        updates.append((review_date, review_id, article))
+            await db.executemany(
+                "UPDATE product_urls SET last_review_date = ?, last_review_id = ? WHERE article = ?",
+                updates
+            )
+    
+    async def upsert_reviews(self, root_id: str, rows: Iterable[tuple]):
+        """
+        Сохраняет отзывы товара (общие для всех его вариантов) пачкой. rows - строки
+        review_history_row: (id, createdDate, оценка, текст, плюсы, минусы, имя). Отзывы без id пропускаются.
+        """
+        rows = [(*row, root_id) for row in rows if row[0]]
+        if not rows:
+            return
+        async with self._transaction() as db:
+            await db.executemany(
+                """
+                INSERT INTO reviews (id, created_at, rating, text, pros, cons, user_name, root_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    rating = excluded.rating,
+                    text = excluded.text,
+                    pros = excluded.pros,
+                    cons = excluded.cons,
+                    user_name = excluded.user_name,
+                    root_id = excluded.root_id,
+                    fetched_at = CURRENT_TIMESTAMP
+                """,
+                rows
+            )
@@ -0,0 +1,115 @@
+"""
+Импорт и экспорт списка товаров: CSV, XLSX (нужен пакет openpyxl) и текстовые файлы
+"""
+import csv
+import io
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.parser import extract_articles
+
+# Колонки таблицы, из которых берутся артикулы и ссылки, если в первой строке есть заголовок;
+# без заголовка используется первая колонка
+_ARTICLE_COLUMNS = {"article", "артикул", "nm", "nm_id", "url", "link", "ссылка"}
+# Сколько символов начала CSV смотреть, угадывая разделитель
+_SNIFF_BYTES = 64 * 1024
+
+
+class CatalogFileError(Exception):
+    """Файл не удалось прочитать или записать в нужном формате"""
+
+
+def read_articles(data: bytes, filename: str) -> List[str]:
+    """
+    Артикулы из загруженного файла без повторов, в порядке появления. Формат определяется
+    по расширению: .csv и .xlsx читаются как таблицы, остальные файлы - как текст по строкам.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    try:
+        if extension == ".xlsx":
+            rows, all_columns = _iter_xlsx_rows(data), False
+        elif extension == ".csv":
+            rows, all_columns = _iter_csv_rows(data), False
+        else:
+            rows, all_columns = ([line] for line in _decode(data).splitlines()), True
+        return list(dict.fromkeys(_iter_row_articles(rows, all_columns)))
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise CatalogFileError(str(e)) from e
+
+
+def write_csv(header: Sequence[str], rows: Iterable[Sequence[Any]]) -> bytes:
+    """CSV в UTF-8 с BOM, чтобы Excel правильно показал кириллицу"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+def write_xlsx(sheets: Dict[str, Tuple[Sequence[str], Iterable[Sequence[Any]]]]) -> bytes:
+    """Книга XLSX: лист на каждую пару (заголовок, строки)"""
+    openpyxl = _import_openpyxl()
+    workbook = openpyxl.Workbook(write_only=True)
+    for title, (header, rows) in sheets.items():
+        sheet = workbook.create_sheet(title)
+        sheet.append(list(header))
+        for row in rows:
+            sheet.append(list(row))
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _import_openpyxl():
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise CatalogFileError("Для файлов XLSX установите пакет openpyxl: pip install openpyxl") from e
+    return openpyxl
+
+
+def _decode(data: bytes) -> str:
+    # Таблицы из Excel часто сохранены в cp1251
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1251")
+
+
+def _iter_csv_rows(data: bytes) -> Iterator[List[str]]:
+    text = _decode(data)
+    try:
+        dialect = csv.Sniffer().sniff(text[:_SNIFF_BYTES], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(io.StringIO(text), dialect)
+
+
+def _iter_xlsx_rows(data: bytes) -> Iterator[Tuple[Any, ...]]:
+    openpyxl = _import_openpyxl()
+    try:
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    except Exception as e:
+        raise CatalogFileError(f"Не удалось открыть файл XLSX: {e}") from e
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_row_articles(rows: Iterable[Sequence[Any]], all_columns: bool = False) -> Iterator[str]:
+    columns: Optional[List[int]] = None
+    for row in rows:
+        if columns is None and not all_columns:
+            header = [str(cell or "").strip().lower() for cell in row]
+            columns = [i for i, name in enumerate(header) if name in _ARTICLE_COLUMNS]
+            if columns:
+                continue
+            columns = [0]
+        cells = row if all_columns else [row[i] for i in columns if i < len(row)]
+        for cell in cells:
+            if cell is None:
+                continue
+            # Excel хранит артикул числом
+            value = str(int(cell)) if isinstance(cell, float) and cell.is_integer() else str(cell)
+            yield from extract_articles(value)
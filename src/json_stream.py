@@ -0,0 +1,142 @@
+"""
+Инкрементальный разбор JSON-документа с большим массивом внутри
+"""
+import codecs
+import json
+from typing import Any, List
+
+_WHITESPACE = " \t\n\r"
+# Символы, которыми может продолжиться число: 4 -> 4.6, 1.5 -> 1.5e-3
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class JsonArrayStreamDecoder:
+    """
+    Разбирает JSON-объект верхнего уровня по частям и отдает элементы массива
+    под ключом key по одному, не держа в памяти весь документ.
+    Остальные значения верхнего уровня разбираются и отбрасываются.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ""
+        self._pos = 0
+        self._state = 'start'
+        self._current_key = None
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Добавляет очередную часть документа и возвращает полностью разобранные элементы"""
+        self._buf += self._text_decoder.decode(chunk)
+        items = self._parse(final=False)
+        # Отбрасываем разобранную часть буфера
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        return items
+
+    def close(self) -> List[Any]:
+        """Завершает разбор; ValueError, если документ оборван или некорректен"""
+        self._buf += self._text_decoder.decode(b"", final=True)
+        items = self._parse(final=True)
+        self._skip_whitespace()
+        if self._state != 'done' or self._pos != len(self._buf):
+            raise ValueError("Неполный или некорректный JSON-документ")
+        return items
+
+    def _skip_whitespace(self):
+        while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+            self._pos += 1
+
+    def _next_char(self):
+        self._skip_whitespace()
+        return self._buf[self._pos] if self._pos < len(self._buf) else None
+
+    def _decode_value(self, final: bool):
+        """Разбирает значение с текущей позиции; (False, None), если данных пока не хватает"""
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return False, None
+        # Число в конце буфера может продолжиться в следующей части: raw_decode разбирает
+        # "4." и "1.5e" как 4 и 1.5, оставляя хвост из символов числа
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if is_number and not final and not self._buf[end:].lstrip(_NUMBER_CHARS):
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _expect(self, char: str):
+        if self._buf[self._pos] != char:
+            raise ValueError(f"Ожидался '{char}' в позиции {self._pos}")
+        self._pos += 1
+
+    def _parse(self, final: bool) -> List[Any]:
+        items = []
+        while True:
+            char = self._next_char()
+            if char is None or self._state == 'done':
+                return items
+
+            if self._state == 'start':
+                self._expect('{')
+                self._state = 'key'
+
+            elif self._state == 'key':
+                if char == '}':
+                    self._pos += 1
+                    self._state = 'done'
+                    continue
+                ok, key = self._decode_value(final)
+                if not ok:
+                    return items
+                if not isinstance(key, str):
+                    raise ValueError("Ключ объекта должен быть строкой")
+                self._current_key = key
+                self._state = 'colon'
+
+            elif self._state == 'colon':
+                self._expect(':')
+                self._state = 'value'
+
+            elif self._state == 'value':
+                if self._current_key == self.key and char == '[':
+                    self._pos += 1
+                    self._state = 'array_item'
+                    continue
+                ok, value = self._decode_value(final)
+                if not ok:
+                    return items
+                if self._current_key == self.key and value is not None:
+                    raise ValueError(f"Значение '{self.key}' должно быть массивом")
+                self._state = 'object_separator'
+
+            elif self._state == 'array_item':
+                if char == ']':
+                    self._pos += 1
+                    self._state = 'object_separator'
+                    continue
+                ok, item = self._decode_value(final)
+                if not ok:
+                    return items
+                items.append(item)
+                self._state = 'array_separator'
+
+            elif self._state == 'array_separator':
+                if char == ']':
+                    self._pos += 1
+                    self._state = 'object_separator'
+                else:
+                    self._expect(',')
+                    self._state = 'array_item'
+
+            elif self._state == 'object_separator':
+                if char == '}':
+                    self._pos += 1
+                    self._state = 'done'
+                else:
+                    self._expect(',')
+                    self._state = 'key'
@@ -0,0 +1,71 @@
+"""
+Выбор зеркала API по скользящим (EWMA) задержке и доле ошибок
+"""
+import random
+from typing import Callable, Dict, Iterable, List, Optional
+
+from config.settings import (
+    MIRROR_EWMA_ALPHA,
+    MIRROR_ERROR_PENALTY,
+    MIRROR_EXPLORE_RATE,
+    HEDGE_DELAY_FACTOR,
+    HEDGE_MIN_DELAY
+)
+
+
+class MirrorStats:
+    """Экспоненциально сглаженные задержка (с) и доля ошибок одного зеркала"""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+
+    def score(self) -> float:
+        # Зеркало без замеров пробуем первым, чтобы получить для него оценку
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (1 + MIRROR_ERROR_PENALTY * self.error_rate)
+
+
+class MirrorSelector:
+    """
+    Упорядочивает зеркала от лучшего к худшему: сначала доступные (is_available),
+    среди них - по задержке с поправкой на долю ошибок. С вероятностью
+    MIRROR_EXPLORE_RATE первые два меняются местами, чтобы оценка отстающего
+    зеркала не устаревала.
+    """
+
+    def __init__(self, base_urls: Iterable[str], alpha: float = MIRROR_EWMA_ALPHA,
+                 is_available: Optional[Callable[[str], bool]] = None):
+        self.base_urls = list(base_urls)
+        if not self.base_urls:
+            raise ValueError("Нужно хотя бы одно зеркало")
+        self.alpha = alpha
+        self.is_available = is_available or (lambda base_url: True)
+        self.stats: Dict[str, MirrorStats] = {base_url: MirrorStats() for base_url in self.base_urls}
+
+    def ranked(self) -> List[str]:
+        ranked = sorted(
+            self.base_urls,
+            key=lambda base_url: (not self.is_available(base_url), self.stats[base_url].score())
+        )
+        if len(ranked) > 1 and self.is_available(ranked[1]) and random.random() < MIRROR_EXPLORE_RATE:
+            ranked[0], ranked[1] = ranked[1], ranked[0]
+        return ranked
+
+    def observe_latency(self, base_url: str, seconds: float):
+        stats = self.stats[base_url]
+        if stats.latency is None:
+            stats.latency = seconds
+        else:
+            stats.latency += self.alpha * (seconds - stats.latency)
+
+    def observe_result(self, base_url: str, success: bool):
+        stats = self.stats[base_url]
+        stats.error_rate += self.alpha * ((0.0 if success else 1.0) - stats.error_rate)
+
+    def hedge_delay(self, base_url: str) -> float:
+        """Через сколько секунд без ответа стоит продублировать запрос на следующее зеркало"""
+        latency = self.stats[base_url].latency
+        if latency is None:
+            return HEDGE_DELAY_FACTOR * HEDGE_MIN_DELAY
+        return max(HEDGE_MIN_DELAY, HEDGE_DELAY_FACTOR * latency)
@@ -0,0 +1,110 @@
+"""
+Парсинг сохраненных товаров с учетом кэша root ID и меток последних отзывов
+"""
+import asyncio
+from dataclasses import dataclass
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from src.parser import AsyncWildberriesReviewParser, ReviewsResult, review_timestamp_key
+
+
+@dataclass
+class ArticleGroup:
+    """
+    Артикулы с общим root ID (варианты цвета/размера одного товара) и общий для них
+    результат. Для ненайденного товара root_id = None и результат пустой, для товара,
+    root ID которого получить не удалось, результат - исключение.
+    """
+    root_id: Optional[str]
+    articles: List[str]
+    result: Union[ReviewsResult, BaseException, None] = None
+
+    @property
+    def label(self) -> str:
+        return ", ".join(self.articles)
+
+    def since(self, marks: Dict[str, str]) -> Optional[str]:
+        """
+        Самая ранняя метка среди артикулов группы: у вариантов один набор отзывов,
+        поэтому метка любого из них относится ко всей группе
+        """
+        group_marks = [marks[article] for article in self.articles if marks.get(article)]
+        return min(group_marks, key=review_timestamp_key) if group_marks else None
+
+
+async def resolve_article_groups(db, parser: AsyncWildberriesReviewParser,
+                                 urls: List[tuple]) -> List[ArticleGroup]:
+    """
+    Группирует сохраненные товары (article, url, root_id) по root ID в порядке urls.
+    Недостающие root ID запрашиваются у API карточки и сохраняются в кэш (если db задана).
+    """
+    stale_articles = [article for article, _, root_id in urls if not root_id]
+    lookups = await parser.lookup_root_ids(stale_articles)
+    if db is not None:
+        await db.set_root_ids({
+            article: root_id for article, root_id in lookups.items() if isinstance(root_id, str)
+        })
+
+    groups: Dict[str, ArticleGroup] = {}
+    result: List[ArticleGroup] = []
+    for article, _, root_id in urls:
+        root_id = root_id or lookups.get(article)
+        if isinstance(root_id, BaseException):
+            result.append(ArticleGroup(None, [article], root_id))
+        elif not root_id:
+            result.append(ArticleGroup(None, [article], ReviewsResult()))
+        elif root_id in groups:
+            groups[root_id].articles.append(article)
+        else:
+            groups[root_id] = ArticleGroup(root_id, [article])
+            result.append(groups[root_id])
+    return result
+
+
+async def parse_article_group(db, parser: AsyncWildberriesReviewParser, group: ArticleGroup,
+                              since: Optional[str] = None) -> Union[ReviewsResult, BaseException]:
+    """
+    Загружает отзывы группы одним запросом (только новее since, если задан) и сохраняет
+    их в историю под root ID группы (если db задана). Ошибка сохраняется в group.result.
+    """
+    if group.result is None:
+        try:
+            group.result = await parser.parse_root_id(
+                group.root_id, since=since,
+                history_sink=partial(db.upsert_reviews, group.root_id) if db is not None else None
+            )
+        except Exception as e:
+            group.result = e
+    return group.result
+
+
+async def iter_parsed_groups(db, parser: AsyncWildberriesReviewParser, groups: List[ArticleGroup],
+                             marks: Optional[Dict[str, str]] = None) -> AsyncIterator[ArticleGroup]:
+    """
+    Парсит группы конкурентно и отдает каждую сразу после завершения (в порядке готовности).
+    Если перебор прерван, незавершенные загрузки отменяются.
+    """
+    marks = marks or {}
+
+    async def parse(group: ArticleGroup) -> ArticleGroup:
+        await parse_article_group(db, parser, group, group.since(marks))
+        return group
+
+    tasks = [asyncio.ensure_future(parse(group)) for group in groups]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def group_marks(groups: List[ArticleGroup]) -> Dict[str, Tuple[str, Optional[str]]]:
+    """Метки (дата, id) самых свежих отзывов для всех артикулов успешно обработанных групп"""
+    return {
+        article: (group.result.newest_date, group.result.newest_id)
+        for group in groups
+        if isinstance(group.result, ReviewsResult) and group.result.newest_date
+        for article in group.articles
+    }
@@ -2,10 +2,19 @@
 Парсер отзывов Wildberries
 """
 import re
+import json
+import heapq
+import asyncio
+import time
+import hashlib
 import requests
+import aiohttp
 import logging
-from typing import List, Dict, Optional
-from datetime import datetime
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from typing import Awaitable, Callable, List, Dict, Optional, Iterable, Tuple, Union
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
 
 from config.settings import (
     MAX_REVIEWS, 
@@ -13,8 +22,24 @@ from config.settings import (
     CARD_API_BASE_URL,
     FEEDBACKS_API_BASE_URL, 
     REQUEST_TIMEOUT, 
-    REQUEST_HEADERS
+    REQUEST_HEADERS,
+    PARSER_CONCURRENCY,
+    PARSER_POOL_SIZE,
+    PARSER_KEEPALIVE_TIMEOUT,
+    STREAM_DECODE_MIN_BYTES,
+    STREAM_CHUNK_SIZE,
+    HISTORY_BATCH_SIZE,
+    RETRY_MAX_ATTEMPTS,
+    FEEDBACKS_API_MIRRORS,
+    HEDGE_ENABLED,
+    PARSE_RESULT_CACHE_TTL,
+    FEEDBACKS_CACHE_MAX_ENTRIES,
+    CARD_BATCH_SIZE
 )
+from src.json_stream import JsonArrayStreamDecoder
+from src.rate_limiter import RateLimiter, FetchError, parse_retry_after, backoff_delay
+from src.mirrors import MirrorSelector
+from src.single_flight import SingleFlight
 
 # Настройка логирования
 logging.basicConfig(
@@ -23,102 +48,275 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Ссылка на товар WB: полная, мобильная и короткая (wb.ru), с артикулом в пути /catalog/<артикул>
+# (страница товара, а не, например, /catalog/0/search.aspx) или в параметре card/nm;
+# отдельно - артикул числом, если он не часть ссылки. Ссылка заканчивается на пробеле,
+# запятой или точке с запятой, чтобы из склеенных ссылок находились все артикулы
+_PRODUCT_LINK_PATTERN = re.compile(
+    r"(?:https?://)?(?:www\.|m\.)?(?:wildberries\.(?:ru|by|kz|am|kg|uz|ge)|wb\.ru)"
+    r"/(?:catalog/(?P<catalog>\d+)(?=/detail\b|/?(?:[?#\s,;]|$))|[^\s,;]*?[?&](?:card|nm)=(?P<card>\d+))[^\s,;]*"
+    r"|(?<![\w/=.:-])(?P<article>\d{5,12})(?![\w/]|\.\d)",
+    re.IGNORECASE
+)
 
-class WildberriesReviewParser:
-    """Парсер отзывов с Wildberries"""
+
+def extract_articles(text: str) -> List[str]:
+    """
+    Все артикулы из текста в порядке появления (с повторами): из полных, мобильных
+    и коротких ссылок WB, а также артикулы, отправленные просто числом
+    """
+    return [
+        match.group('catalog') or match.group('card') or match.group('article')
+        for match in _PRODUCT_LINK_PATTERN.finditer(text)
+    ]
+
+
+@dataclass
+class ReviewsResult:
+    """Результат обработки отзывов товара"""
+    # Отзывы с низкой оценкой для отчета
+    reviews: List[Dict] = field(default_factory=list)
+    # Дата и id самого свежего из просмотренных отзывов (метка для инкрементального парсинга)
+    newest_date: Optional[str] = None
+    newest_id: Optional[str] = None
+
+
+@dataclass
+class FeedbacksCacheEntry:
+    """Валидаторы и итог последней загрузки отзывов по root ID"""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    digest: Optional[str] = None
+    # Хэши начала документа по блокам STREAM_CHUNK_SIZE (только после потокового разбора)
+    block_digests: Optional[List[str]] = None
+    # Все отзывы документа уже переданы в history_sink (полный разбор без since)
+    history_complete: bool = False
+    # Верхняя граница даты самого свежего отзыва в документе
+    newest_bound: Optional[str] = None
+    # Результат полной обработки (без since), если документ обрабатывался целиком
+    full_result: Optional[ReviewsResult] = None
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(REQUEST_HEADERS)
+    def can_reuse(self, since: Optional[str]) -> bool:
+        """Можно ли ответить без повторной обработки, если документ не изменился"""
+        if since is None:
+            return self.full_result is not None
+        return (
+            self.newest_bound is not None
+            and review_timestamp_key(self.newest_bound) <= review_timestamp_key(since)
+        )
     
-    def extract_article_from_url(self, product_url: str) -> Optional[str]:
-        """Извлекает артикул товара из URL"""
-        pattern = r'/catalog/(\d+)/'
-        match = re.search(pattern, product_url)
-        return match.group(1) if match else None
+    def reuse(self, since: Optional[str]) -> ReviewsResult:
+        return self.full_result if since is None else ReviewsResult()
+
+
+def has_review_content(review: Dict) -> bool:
+    """Есть ли у отзыва текст в полях text, pros или cons"""
+    return bool(
+        (review.get('text', '').strip()) or 
+        (review.get('pros', '').strip()) or 
+        (review.get('cons', '').strip())
+    )
+
+
+def is_low_rating(review: Dict) -> bool:
+    """Оценка отзыва не выше MAX_VALUATION"""
+    return review.get('productValuation', 5) <= MAX_VALUATION
+
+
+def review_history_row(review: Dict) -> tuple:
+    """Компактная строка для истории отзывов: (id, createdDate, оценка, текст, плюсы, минусы, имя)"""
+    return (
+        review.get('id'),
+        review.get('createdDate', ''),
+        review.get('productValuation'),
+        review.get('text', ''),
+        review.get('pros', ''),
+        review.get('cons', ''),
+        (review.get('wbUserDetails') or {}).get('name')
+    )
+
+
+# Асинхронный приемник строк истории отзывов (например, запись в БД пачкой)
+HistorySink = Callable[[List[tuple]], Awaitable[None]]
+
+
+def review_timestamp_key(created_date: str) -> str:
+    """
+    Приводит createdDate к ключу, сравнение которого совпадает со сравнением моментов
+    времени: 'YYYY-MM-DDTHH:MM:SSZ' в UTC плюс '.ffffff' при ненулевых микросекундах.
+    Обычный формат WB уже является ключом, остальные варианты ISO 8601 разбираются
+    через datetime. Пустые и некорректные даты получают ключ '' (самые старые).
+    """
+    if len(created_date) == 20 and created_date[19] == 'Z':
+        return created_date
+    if not created_date:
+        return ''
+    try:
+        date_obj = datetime.fromisoformat(created_date.replace('Z', '+00:00'))
+    except ValueError:
+        return ''
+    if date_obj.tzinfo is not None:
+        date_obj = date_obj.astimezone(timezone.utc)
+    key = date_obj.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return f"{key}.{date_obj.microsecond:06d}" if date_obj.microsecond else key
+
+
+class ReviewsSelector:
+    """
+    Отбор отзывов за один проход: фильтр по метке since, фильтр по содержимому,
+    последние limit отзывов и фильтр по оценке. Без since хранит в куче только
+    limit отзывов с содержимым (сами отзывы - только с низкой оценкой).
+    Результат совпадает с последовательным filter -> sort -> filter.
+    Если передан список history, в него добавляются строки истории
+    (review_history_row) всех отзывов новее since.
+    """
     
-    def fetch_product_root_id(self, article: str) -> Optional[str]:
-        """Получает root ID товара из API карточки"""
-        try:
-            url = f"{CARD_API_BASE_URL}{article}"
-            logger.info(f"Запрос к API карточки товара: {url}")
-            
-            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            
-            data = response.json()
-            products = data.get('data', {}).get('products', [])
-            
-            if not products:
-                logger.error("Товар не найден в ответе API")
-                return None
-                
-            root_id = products[0].get('root')
-            if not root_id:
-                logger.error("Root ID не найден в данных товара")
-                return None
-                
-            logger.info(f"Root ID товара: {root_id}")
-            return str(root_id)
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Ошибка при запросе к API карточки: {e}")
-            return None
-        except ValueError as e:
-            logger.error(f"Ошибка при парсинге JSON карточки: {e}")
-            return None
+    def __init__(self, since: Optional[str] = None, limit: int = MAX_REVIEWS,
+                 history: Optional[List[tuple]] = None):
+        self.since = since
+        self.limit = limit
+        self.history = history
+        self._since_key = review_timestamp_key(since) if since else None
+        self._seq = 0
+        # Куча (ключ даты, -порядковый номер, отзыв или None для высокой оценки)
+        self._latest: List[tuple] = []
+        self._newest: Optional[Dict] = None
+        self._newest_key = ''
     
-    def fetch_reviews_data(self, root_id: str) -> Optional[Dict]:
-        """Получает данные отзывов по root ID товара"""
-        try:
-            url = f"{FEEDBACKS_API_BASE_URL}{root_id}"
-            logger.info(f"Запрос к API отзывов: {url}")
-            
-            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Ошибка при запросе к API отзывов: {e}")
-            return None
-        except ValueError as e:
-            logger.error(f"Ошибка при парсинге JSON отзывов: {e}")
-            return None
+    def add(self, review: Dict):
+        self.extend((review,))
+    
+    def extend(self, reviews: Iterable[Dict]):
+        if self._since_key is None:
+            self._extend_latest(reviews)
+        else:
+            self._extend_since(reviews)
+    
+    def _extend_since(self, reviews: Iterable[Dict]):
+        since_key = self._since_key
+        history = self.history
+        for review in reviews:
+            key = review_timestamp_key(review.get('createdDate', ''))
+            if key <= since_key:
+                continue
+            if history is not None:
+                history.append(review_history_row(review))
+            if key > self._newest_key or self._newest is None:
+                self._newest = review
+                self._newest_key = key
+            if has_review_content(review) and is_low_rating(review):
+                self._latest.append((key, 0, review))
     
-    def filter_reviews_with_content(self, reviews: List[Dict]) -> List[Dict]:
-        """Фильтрует отзывы, содержащие текст в полях text, pros или cons"""
-        filtered_reviews = []
+    def _extend_latest(self, reviews: Iterable[Dict]):
+        # Горячий цикл: состояние держим в локальных переменных
+        limit = self.limit
+        latest = self._latest
+        history = self.history
+        seq = self._seq
+        newest = self._newest
+        newest_key = self._newest_key
+        full = len(latest) >= limit
+        # При limit = 0 порог выше любого ключа
+        threshold = latest[0][0] if latest else '\uffff'
         
         for review in reviews:
-            has_content = (
-                (review.get('text', '').strip()) or 
-                (review.get('pros', '').strip()) or 
-                (review.get('cons', '').strip())
-            )
+            key = review.get('createdDate', '')
+            if len(key) != 20 or key[19] != 'Z':
+                key = review_timestamp_key(key)
+            if history is not None:
+                history.append(review_history_row(review))
+            if key > newest_key or newest is None:
+                newest = review
+                newest_key = key
+            
+            # При равных датах побеждает более ранний в документе отзыв, как в sorted()
+            seq += 1
+            if full and key <= threshold:
+                continue
+            if not has_review_content(review):
+                continue
             
-            if has_content:
-                filtered_reviews.append(review)
-        
-        return filtered_reviews
-    
-    def get_latest_reviews(self, reviews: List[Dict], limit: int = MAX_REVIEWS) -> List[Dict]:
-        """Получает последние отзывы по времени создания"""
-        # Сортируем по дате создания (убывание)
-        sorted_reviews = sorted(
-            reviews, 
-            key=lambda x: x.get('createdDate', ''), 
-            reverse=True
+            item = (key, -seq, review if is_low_rating(review) else None)
+            if full:
+                heapq.heapreplace(latest, item)
+            else:
+                heapq.heappush(latest, item)
+                full = len(latest) >= limit
+            if full:
+                threshold = latest[0][0]
+        
+        self._seq = seq
+        self._newest = newest
+        self._newest_key = newest_key
+    
+    def result(self) -> ReviewsResult:
+        if self._newest is None:
+            return ReviewsResult()
+        
+        latest = sorted(self._latest, key=lambda item: item[:2], reverse=True)
+        return ReviewsResult(
+            reviews=[review for _, _, review in latest if review is not None],
+            newest_date=self._newest.get('createdDate') or None,
+            newest_id=self._newest.get('id')
         )
+
+
+class BaseReviewParser:
+    """Общая логика обработки отзывов, не зависящая от способа загрузки"""
+    
+    def extract_article_from_url(self, product_url: str) -> Optional[str]:
+        """Извлекает артикул товара из URL"""
+        articles = self.extract_articles(product_url)
+        return articles[0] if articles else None
+    
+    def extract_articles(self, text: str) -> List[str]:
+        """Все артикулы из текста, см. extract_articles"""
+        return extract_articles(text)
+    
+    def extract_root_id(self, data: Dict) -> Optional[str]:
+        """Достает root ID из ответа API карточки"""
+        products = data.get('data', {}).get('products', [])
         
-        return sorted_reviews[:limit]
+        if not products:
+            logger.error("Товар не найден в ответе API")
+            return None
+            
+        root_id = products[0].get('root')
+        if not root_id:
+            logger.error("Root ID не найден в данных товара")
+            return None
+            
+        logger.info(f"Root ID товара: {root_id}")
+        return str(root_id)
     
-    def filter_low_rating_reviews(self, reviews: List[Dict]) -> List[Dict]:
-        """Фильтрует отзывы с низкой оценкой (меньше MAX_VALUATION)"""
-        return [
-            review for review in reviews 
-            if review.get('productValuation', 5) <= MAX_VALUATION
-        ]
+    def extract_root_ids(self, data: Dict, articles: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Root ID каждого запрошенного артикула из пакетного ответа API карточки (None - не найден)"""
+        root_ids = {
+            str(product.get('id')): str(product['root'])
+            for product in data.get('data', {}).get('products', [])
+            if product.get('root')
+        }
+        result = {str(article): root_ids.get(str(article)) for article in articles}
+        
+        missing = [article for article, root_id in result.items() if root_id is None]
+        if missing:
+            logger.warning(f"Товары не найдены в ответе API: {', '.join(missing)}")
+        return result
+    
+    def process_reviews(self, data: Dict) -> List[Dict]:
+        """Отбирает отзывы с низкой оценкой среди последних отзывов с содержимым"""
+        return self.process_reviews_since(data).reviews
+    
+    def process_reviews_since(self, data: Dict, since: Optional[str] = None,
+                              history: Optional[List[tuple]] = None) -> ReviewsResult:
+        """
+        Без since отбирает отзывы с низкой оценкой среди последних MAX_REVIEWS отзывов.
+        С since обрабатывает только отзывы новее метки и возвращает все новые с низкой оценкой.
+        В history (если передан) добавляются строки истории обработанных отзывов.
+        """
+        selector = ReviewsSelector(since, history=history)
+        selector.extend(data.get('feedbacks') or [])
+        return selector.result()
     
     def format_review_for_log(self, review: Dict) -> str:
         """Форматирует отзыв для вывода в лог"""
@@ -148,6 +346,50 @@ class WildberriesReviewParser:
         content = " | ".join(review_content)
         
         return f"[{formatted_date}] {user_name} (Оценка: {rating}): {content}"
+
+
+class WildberriesReviewParser(BaseReviewParser):
+    """Парсер отзывов с Wildberries"""
+    
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update(REQUEST_HEADERS)
+    
+    def fetch_product_root_id(self, article: str) -> Optional[str]:
+        """Получает root ID товара из API карточки"""
+        try:
+            url = f"{CARD_API_BASE_URL}{article}"
+            logger.info(f"Запрос к API карточки товара: {url}")
+            
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            
+            return self.extract_root_id(response.json())
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Ошибка при запросе к API карточки: {e}")
+            return None
+        except ValueError as e:
+            logger.error(f"Ошибка при парсинге JSON карточки: {e}")
+            return None
+    
+    def fetch_reviews_data(self, root_id: str) -> Optional[Dict]:
+        """Получает данные отзывов по root ID товара"""
+        try:
+            url = f"{FEEDBACKS_API_BASE_URL}{root_id}"
+            logger.info(f"Запрос к API отзывов: {url}")
+            
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            
+            return response.json()
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Ошибка при запросе к API отзывов: {e}")
+            return None
+        except ValueError as e:
+            logger.error(f"Ошибка при парсинге JSON отзывов: {e}")
+            return None
     
     def parse_reviews(self, product_url: str) -> None:
         """Основной метод парсинга отзывов"""
@@ -180,16 +422,8 @@ class WildberriesReviewParser:
         
         logger.info(f"Всего отзывов получено: {len(reviews)}")
         
-        # Фильтруем отзывы с содержимым
-        reviews_with_content = self.filter_reviews_with_content(reviews)
-        logger.info(f"Отзывов с содержимым: {len(reviews_with_content)}")
-        
-        # Получаем последние отзывы
-        latest_reviews = self.get_latest_reviews(reviews_with_content)
-        logger.info(f"Последних отзывов для анализа: {len(latest_reviews)}")
-        
-        # Фильтруем отзывы с низкой оценкой
-        low_rating_reviews = self.filter_low_rating_reviews(latest_reviews)
+        # Отзывы с низкой оценкой среди последних отзывов с содержимым - за один проход
+        low_rating_reviews = self.process_reviews(data)
         
         if not low_rating_reviews:
             logger.info(f"Отзывов с оценкой меньше {MAX_VALUATION} не найдено среди последних {MAX_REVIEWS}")
@@ -201,4 +435,377 @@ class WildberriesReviewParser:
         for i, review in enumerate(low_rating_reviews, 1):
             formatted_review = self.format_review_for_log(review)
             logger.info(f"{i}. {formatted_review}")
-            logger.info("-" * 80)
\ No newline at end of file
+            logger.info("-" * 80)
+
+
+class AsyncWildberriesReviewParser(BaseReviewParser):
+    """Асинхронный парсер отзывов с Wildberries на общем пуле соединений aiohttp"""
+    
+    def __init__(self, concurrency: int = PARSER_CONCURRENCY, pool_size: int = PARSER_POOL_SIZE,
+                 keepalive_timeout: float = PARSER_KEEPALIVE_TIMEOUT,
+                 feedbacks_mirrors: Optional[Iterable[str]] = None,
+                 feedbacks_cache_size: int = FEEDBACKS_CACHE_MAX_ENTRIES):
+        self.concurrency = concurrency
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Валидаторы и хэши документов отзывов для условных запросов (LRU, не больше feedbacks_cache_size)
+        self._feedbacks_cache: "OrderedDict[str, FeedbacksCacheEntry]" = OrderedDict()
+        self.feedbacks_cache_size = feedbacks_cache_size
+        # Общие запросы и короткий кэш результатов: по артикулу и по (root ID, since)
+        self._root_id_flights = SingleFlight(ttl=PARSE_RESULT_CACHE_TTL)
+        self._reviews_flights = SingleFlight(ttl=PARSE_RESULT_CACHE_TTL)
+        # Ограничение частоты, повторы и circuit breaker по хостам WB
+        self.rate_limiter = RateLimiter()
+        # Зеркала API отзывов; хост с разомкнутым circuit breaker уходит в конец очереди
+        self.mirrors = MirrorSelector(
+            feedbacks_mirrors or FEEDBACKS_API_MIRRORS,
+            is_available=lambda base_url: self.rate_limiter.for_host(urlsplit(base_url).hostname).available
+        )
+    
+    async def __aenter__(self) -> "AsyncWildberriesReviewParser":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Лениво создает сессию с keep-alive пулом соединений"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=REQUEST_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            )
+        return self._session
+    
+    async def close(self) -> None:
+        """Закрывает сессию и все соединения пула"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def _request(self, url: str, headers: Optional[Dict[str, str]] = None) -> aiohttp.ClientResponse:
+        """
+        GET с ограничением частоты по хосту. 429, 5xx и сетевые ошибки повторяются
+        с экспоненциальной задержкой (или по Retry-After); после RETRY_MAX_ATTEMPTS
+        попыток, а также при разомкнутом circuit breaker бросается FetchError.
+        Слот concurrency занимается только на время самой попытки: ожидание токена
+        и паузы между повторами не мешают запросам к другим товарам.
+        Ответ нужно освободить (async with response / response.release()).
+        """
+        limiter = self.rate_limiter.for_host(urlsplit(url).hostname)
+        
+        for attempt in range(RETRY_MAX_ATTEMPTS):
+            probe = await limiter.acquire()
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    response = await self._get_session().get(url, headers=headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                limiter.on_failure()
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status != 429 and response.status < 500:
+                    limiter.on_success()
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                response.release()
+                limiter.on_failure(throttled=response.status == 429, retry_after=retry_after)
+                error = f"HTTP {response.status}"
+            finally:
+                # Отмененный пробный запрос (проигравший хедж, остановка) не записывает исход:
+                # без этого circuit breaker остался бы разомкнутым навсегда
+                limiter.release_probe(probe)
+            
+            if attempt + 1 < RETRY_MAX_ATTEMPTS:
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                logger.warning(f"{url}: {error}, повтор через {delay:.1f} с")
+                await asyncio.sleep(delay)
+        
+        raise FetchError(f"{url}: {error} после {RETRY_MAX_ATTEMPTS} попыток")
+    
+    async def _timed_request(self, base_url: str, path: str,
+                             headers: Optional[Dict[str, str]] = None) -> aiohttp.ClientResponse:
+        """_request к зеркалу с учетом задержки и исхода в его статистике"""
+        url = f"{base_url}{path}"
+        logger.info(f"Запрос к API отзывов: {url}")
+        started = time.monotonic()
+        try:
+            response = await self._request(url, headers)
+        except FetchError:
+            self.mirrors.observe_result(base_url, False)
+            raise
+        except asyncio.CancelledError:
+            # Проигравший хедж: его задержка не меньше уже прошедшего времени
+            self.mirrors.observe_latency(base_url, time.monotonic() - started)
+            raise
+        self.mirrors.observe_latency(base_url, time.monotonic() - started)
+        self.mirrors.observe_result(base_url, True)
+        return response
+    
+    async def _request_feedbacks(self, path: str,
+                                 headers: Optional[Dict[str, str]] = None) -> aiohttp.ClientResponse:
+        """
+        Запрос к лучшему зеркалу API отзывов. Если оно не ответило за hedge_delay,
+        запрос дублируется на следующее зеркало и берется первый ответ; при ошибке
+        запрос уходит на следующее зеркало. FetchError - если не ответило ни одно.
+        """
+        mirrors = self.mirrors.ranked()
+        tasks: List[asyncio.Task] = []
+        pending = set()
+        errors = []
+        
+        def launch():
+            task = asyncio.ensure_future(self._timed_request(mirrors[len(tasks)], path, headers))
+            tasks.append(task)
+            pending.add(task)
+        
+        launch()
+        winner = None
+        try:
+            while pending:
+                can_hedge = HEDGE_ENABLED and len(tasks) < len(mirrors)
+                timeout = self.mirrors.hedge_delay(mirrors[len(tasks) - 1]) if can_hedge else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"{mirrors[len(tasks) - 1]} отвечает медленно, дублируем запрос на {mirrors[len(tasks)]}")
+                    launch()
+                    continue
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        winner = task
+                        return task.result()
+                    if not isinstance(error, FetchError):
+                        raise error
+                    errors.append(error)
+                if not pending and len(tasks) < len(mirrors):
+                    logger.warning(f"{errors[-1]}; пробуем зеркало {mirrors[len(tasks)]}")
+                    launch()
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    task.result().release()
+        
+        raise FetchError("; ".join(str(error) for error in errors))
+    
+    async def _get_json(self, url: str) -> Dict:
+        async with await self._request(url) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+    
+    async def fetch_product_root_ids(self, articles: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Получает root ID нескольких товаров одним запросом к API карточки (nm=1;2;3).
+        None - товар не найден; FetchError - данные получить не удалось.
+        Одновременные запросы той же пачки артикулов объединяются в один.
+        """
+        articles = tuple(dict.fromkeys(str(article) for article in articles))
+        return await self._root_id_flights.do(articles, lambda: self._fetch_product_root_ids(articles))
+    
+    async def _fetch_product_root_ids(self, articles: Tuple[str, ...]) -> Dict[str, Optional[str]]:
+        try:
+            url = f"{CARD_API_BASE_URL}{';'.join(articles)}"
+            logger.info(f"Запрос к API карточки товара: {url}")
+            
+            return self.extract_root_ids(await self._get_json(url), articles)
+            
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Ошибка при запросе к API карточки: {e}")
+            raise FetchError(f"Ошибка при запросе к API карточки: {e}") from e
+        except ValueError as e:
+            logger.error(f"Ошибка при парсинге JSON карточки: {e}")
+            raise FetchError(f"Ошибка при парсинге JSON карточки: {e}") from e
+    
+    def _cached_feedbacks(self, root_id: str) -> Optional[FeedbacksCacheEntry]:
+        """Запись кэша отзывов товара; запрошенная запись становится самой свежей"""
+        entry = self._feedbacks_cache.get(root_id)
+        if entry is not None:
+            self._feedbacks_cache.move_to_end(root_id)
+        return entry
+    
+    def _conditional_headers(self, entry: FeedbacksCacheEntry) -> Dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+    
+    async def _stream_reviews(self, response: aiohttp.ClientResponse, since: Optional[str],
+                              history_sink: Optional[HistorySink],
+                              known: Optional[FeedbacksCacheEntry] = None) -> Tuple[ReviewsResult, str, List[str]]:
+        """
+        Разбирает feedbacks[] по мере загрузки, храня в памяти только отобранные отзывы.
+        Строки истории отдаются в history_sink пачками по HISTORY_BATCH_SIZE.
+        
+        Документ читается блоками по STREAM_CHUNK_SIZE, и для каждого запоминается хэш всего
+        документа до конца блока. known - запись кэша, результат которой можно переиспользовать:
+        пока начало документа совпадает с ее документом, отзывы из совпавших блоков уже сохранены
+        в историю и в history_sink не передаются; неизменившийся документ не пишет ничего.
+        Возвращает результат, хэш документа и хэши блоков.
+        """
+        decoder = JsonArrayStreamDecoder('feedbacks')
+        history = [] if history_sink is not None else None
+        selector = ReviewsSelector(since, history=history)
+        digest = hashlib.sha1()
+        block_digests: List[str] = []
+        known_blocks = known.block_digests if known is not None else None
+        matching = known_blocks is not None
+        
+        async def consume(items: List[Dict], verified: bool):
+            selector.extend(items)
+            if history is None:
+                return
+            if verified:
+                history.clear()
+            elif len(history) >= HISTORY_BATCH_SIZE:
+                rows = history[:]
+                history.clear()
+                await history_sink(rows)
+        
+        block = bytearray()
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            block += chunk
+            while len(block) >= STREAM_CHUNK_SIZE:
+                part = bytes(block[:STREAM_CHUNK_SIZE])
+                del block[:STREAM_CHUNK_SIZE]
+                digest.update(part)
+                block_digests.append(digest.hexdigest())
+                index = len(block_digests) - 1
+                matching = matching and index < len(known_blocks) and known_blocks[index] == block_digests[-1]
+                await consume(decoder.feed(part), matching)
+        
+        digest.update(block)
+        matching = matching and digest.hexdigest() == known.digest
+        await consume(decoder.feed(bytes(block)) + decoder.close(), matching)
+        if history:
+            await history_sink(history[:])
+        
+        return selector.result(), digest.hexdigest(), block_digests
+    
+    async def parse_root_id(self, root_id: str, since: Optional[str] = None,
+                            history_sink: Optional[HistorySink] = None) -> ReviewsResult:
+        """
+        Возвращает отзывы с низкой оценкой по уже известному root ID (только новее since, если задан).
+        Неизменившийся документ (304 или тот же хэш) не декодируется и не фильтруется повторно.
+        Большие документы (и документы без Content-Length) разбираются потоково; у них хэш
+        известен только в конце, поэтому документ декодируется, но отзывы из совпавшего
+        с прежним документом начала в history_sink повторно не передаются.
+        Строки истории обработанных отзывов передаются в history_sink, если он задан.
+        Если данные получить не удалось, бросается FetchError (а не пустой результат).
+        
+        Одновременные вызовы с теми же root ID и since выполняют один запрос, а его результат
+        PARSE_RESULT_CACHE_TTL секунд отдается из памяти. В history_sink строки передает
+        только вызов, который действительно загрузил документ.
+        """
+        return await self._reviews_flights.do(
+            (str(root_id), since), lambda: self._parse_root_id(root_id, since, history_sink)
+        )
+    
+    async def _parse_root_id(self, root_id: str, since: Optional[str],
+                             history_sink: Optional[HistorySink]) -> ReviewsResult:
+        entry = self._cached_feedbacks(root_id)
+        reusable = entry is not None and entry.can_reuse(since)
+        # Результат для ответа 304 берется сейчас, вместе с валидаторами: пока идет запрос,
+        # параллельная загрузка нового документа может сбросить full_result записи
+        headers = self._conditional_headers(entry) if reusable else {}
+        unchanged_result = entry.reuse(since) if reusable else None
+        
+        try:
+            async with await self._request_feedbacks(str(root_id), headers) as response:
+                if response.status == 304:
+                    logger.info(f"Отзывы {root_id} не изменились (304)")
+                    return unchanged_result
+                response.raise_for_status()
+                
+                content_length = response.content_length
+                if content_length is None or content_length >= STREAM_DECODE_MIN_BYTES:
+                    # Хэш всего документа известен только после разбора: совпавшие с прежним
+                    # документом блоки сверяются по ходу и не пишутся в историю повторно
+                    result, digest, block_digests = await self._stream_reviews(
+                        response, since, history_sink,
+                        entry if reusable and (since is not None or entry.history_complete) else None
+                    )
+                else:
+                    block_digests = None
+                    body = await response.read()
+                    digest = hashlib.sha1(body).hexdigest()
+                    # Запись могла обновиться, пока шел запрос: сверяемся с текущей
+                    entry = self._cached_feedbacks(root_id)
+                    if entry is not None and digest == entry.digest and entry.can_reuse(since):
+                        logger.info(f"Отзывы {root_id} не изменились (хэш совпал)")
+                        return entry.reuse(since)
+                    history = [] if history_sink is not None else None
+                    result = self.process_reviews_since(json.loads(body), since, history)
+                    if history:
+                        await history_sink(history)
+                
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Ошибка при запросе к API отзывов: {e}")
+            raise FetchError(f"Ошибка при запросе к API отзывов: {e}") from e
+        except ValueError as e:
+            logger.error(f"Ошибка при парсинге JSON отзывов: {e}")
+            raise FetchError(f"Ошибка при парсинге JSON отзывов: {e}") from e
+        
+        entry = self._cached_feedbacks(root_id)
+        if entry is None:
+            entry = self._feedbacks_cache[root_id] = FeedbacksCacheEntry()
+            # Вытесняем товары, которые дольше всех не запрашивались (например, уже не отслеживаются)
+            while len(self._feedbacks_cache) > self.feedbacks_cache_size:
+                self._feedbacks_cache.popitem(last=False)
+        if digest != entry.digest:
+            entry.full_result = None
+            entry.newest_bound = None
+            entry.history_complete = False
+        entry.digest = digest
+        entry.block_digests = block_digests
+        entry.etag = etag
+        entry.last_modified = last_modified
+        if since is None:
+            entry.full_result = result
+            entry.newest_bound = result.newest_date
+            entry.history_complete = entry.history_complete or history_sink is not None
+        elif entry.newest_bound is None:
+            entry.newest_bound = result.newest_date or since
+        return result
+    
+    async def lookup_root_ids(self, articles: Iterable[str]) -> Dict[str, Union[str, None, BaseException]]:
+        """
+        Получает root ID для артикулов пачками по CARD_BATCH_SIZE (пачки запрашиваются
+        конкурентно): значение - root ID, None (товар не найден) или исключение
+        (не удалось получить данные по пачке).
+        """
+        articles = list(dict.fromkeys(str(article) for article in articles))
+        batches = [articles[i:i + CARD_BATCH_SIZE] for i in range(0, len(articles), CARD_BATCH_SIZE)]
+        results = await asyncio.gather(
+            *(self.fetch_product_root_ids(batch) for batch in batches),
+            return_exceptions=True
+        )
+        
+        lookups: Dict[str, Union[str, None, BaseException]] = {}
+        for batch, result in zip(batches, results):
+            for article in batch:
+                lookups[article] = result if isinstance(result, BaseException) else result[article]
+        return lookups
+    
+    async def resolve_root_ids(self, articles: Iterable[str]) -> Dict[str, str]:
+        """Конкурентно получает root ID для артикулов; ненайденные и ошибки в результат не попадают"""
+        return {
+            article: root_id
+            for article, root_id in (await self.lookup_root_ids(articles)).items()
+            if isinstance(root_id, str)
+        }
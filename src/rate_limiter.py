@@ -0,0 +1,210 @@
+"""
+Ограничение частоты запросов к API Wildberries: token bucket, повторы с
+экспоненциальной задержкой и circuit breaker отдельно для каждого хоста
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from config.settings import (
+    RATE_LIMIT_RPS,
+    RATE_LIMIT_MIN_RPS,
+    RATE_LIMIT_MAX_RPS,
+    RATE_LIMIT_BURST,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CIRCUIT_BREAKER_WINDOW,
+    CIRCUIT_BREAKER_MIN_CALLS,
+    CIRCUIT_BREAKER_FAILURE_RATIO,
+    CIRCUIT_BREAKER_OPEN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """Данные не удалось получить (сеть, 429/5xx после повторов, некорректный ответ)"""
+
+
+class CircuitOpenError(FetchError):
+    """Запрос не отправлен: хост временно отключен после серии ошибок"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Переводит заголовок Retry-After (секунды или HTTP-дата) в задержку в секундах"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Экспоненциальная задержка перед повтором с полным случайным разбросом"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket со скоростью, подстраивающейся под ответы сервера (AIMD):
+    на 429 скорость уменьшается вдвое, каждый успешный ответ немного ее увеличивает.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_RPS, capacity: float = RATE_LIMIT_BURST,
+                 min_rate: float = RATE_LIMIT_MIN_RPS, max_rate: float = RATE_LIMIT_MAX_RPS):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Приостанавливает выдачу токенов (например, по Retry-After)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + 1 / max(self.rate, 1.0))
+
+    def on_throttled(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+
+class CircuitBreaker:
+    """
+    Размыкается, когда доля ошибок среди последних window запросов превышает
+    failure_ratio. Через open_seconds пропускает один пробный запрос (half-open):
+    успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(self, window: int = CIRCUIT_BREAKER_WINDOW, min_calls: int = CIRCUIT_BREAKER_MIN_CALLS,
+                 failure_ratio: float = CIRCUIT_BREAKER_FAILURE_RATIO,
+                 open_seconds: float = CIRCUIT_BREAKER_OPEN_SECONDS):
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self._outcomes = deque(maxlen=window)
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    @property
+    def allows_request(self) -> bool:
+        """Пропустит ли before_request запрос прямо сейчас"""
+        if self._opened_at is None:
+            return True
+        return time.monotonic() - self._opened_at >= self.open_seconds and not self._probe_in_flight
+
+    def before_request(self) -> bool:
+        """
+        Бросает CircuitOpenError, если запрос сейчас отправлять нельзя.
+        True - запрос пробный (half-open): если он завершится без record (например,
+        будет отменен), слот нужно освободить через release_probe.
+        """
+        if self._opened_at is None:
+            return False
+        if time.monotonic() - self._opened_at < self.open_seconds or self._probe_in_flight:
+            raise CircuitOpenError("Хост временно недоступен после серии ошибок")
+        self._probe_in_flight = True
+        return True
+
+    def release_probe(self):
+        """Освобождает слот пробного запроса, исход которого не был записан"""
+        self._probe_in_flight = False
+
+    def record(self, success: bool):
+        if self._opened_at is not None:
+            # Итог пробного запроса в состоянии half-open
+            self._probe_in_flight = False
+            if success:
+                self._opened_at = None
+                self._outcomes.clear()
+            else:
+                self._opened_at = time.monotonic()
+            return
+
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_ratio:
+            self._opened_at = time.monotonic()
+            logger.warning(f"Circuit breaker разомкнут: {failures} ошибок из {len(self._outcomes)} запросов")
+
+
+class HostLimiter:
+    """Token bucket и circuit breaker одного хоста"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.bucket = AdaptiveTokenBucket()
+        self.breaker = CircuitBreaker()
+
+    @property
+    def available(self) -> bool:
+        return self.breaker.allows_request
+
+    async def acquire(self) -> bool:
+        """Ждет токен; True - запрос пробный, см. CircuitBreaker.before_request"""
+        probe = self.breaker.before_request()
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.release_probe(probe)
+            raise
+        return probe
+
+    def release_probe(self, probe: bool):
+        if probe:
+            self.breaker.release_probe()
+
+    def on_success(self):
+        self.bucket.on_success()
+        self.breaker.record(True)
+
+    def on_failure(self, throttled: bool = False, retry_after: Optional[float] = None):
+        if throttled:
+            self.bucket.on_throttled()
+        if retry_after:
+            self.bucket.pause(retry_after)
+        self.breaker.record(False)
+
+
+class RateLimiter:
+    """Реестр ограничителей по хостам"""
+
+    def __init__(self):
+        self._hosts: Dict[str, HostLimiter] = {}
+
+    def for_host(self, host: str) -> HostLimiter:
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            limiter = self._hosts[host] = HostLimiter(host)
+        return limiter
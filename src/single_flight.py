@@ -0,0 +1,46 @@
+"""
+Объединение одновременных одинаковых запросов (single-flight) с коротким кэшем результатов
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Одновременные вызовы do() с одним ключом выполняют func один раз и получают общий
+    результат (или общее исключение). Успешный результат еще ttl секунд отдается
+    из кэша без вызова func. Отмена одного из ожидающих не отменяет общий запрос.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self._next_prune = 0.0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        cached = self._results.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        self._calls.pop(key, None)
+        # Исключение забираем здесь, чтобы не было предупреждения, если все ожидающие отменены
+        if future.cancelled() or future.exception() is not None or self.ttl <= 0:
+            return
+        now = time.monotonic()
+        self._results[key] = (now + self.ttl, future.result())
+        if now >= self._next_prune:
+            self._next_prune = now + self.ttl
+            for stale_key in [k for k, (expires_at, _) in self._results.items() if expires_at <= now]:
+                del self._results[stale_key]
@@ -0,0 +1,64 @@
+import asyncio
+
+from db.database import Database
+
+ROW = ('review1', '2024-02-01T10:00:00Z', 1, 'брак', '', '', 'Покупатель')
+
+
+def run(db_path, scenario):
+    async def wrapper():
+        db = Database(str(db_path))
+        await db.init_db()
+        await db.add_users([1, 2])
+        try:
+            await scenario(db)
+        finally:
+            await db.close()
+
+    asyncio.run(wrapper())
+
+
+def test_review_history_is_shared_by_variants(tmp_path):
+    async def scenario(db):
+        # Пользователи следят за разными вариантами одного товара
+        await db.add_user_urls(1, [('111', 'url1', '900')], limit=10)
+        await db.add_user_urls(2, [('222', 'url2', '900')], limit=10)
+        await db.upsert_reviews('900', [ROW])
+
+        assert [row[:2] for row in await db.get_user_latest_reviews(1, 5)] == [('111', 'review1')]
+        assert [row[:2] for row in await db.get_user_latest_reviews(2, 5)] == [('222', 'review1')]
+
+        # Отзывы остаются, пока отслеживается хотя бы один вариант
+        await db.delete_user_articles(1, ['111'])
+        assert [row[:2] for row in await db.get_user_latest_reviews(2, 5)] == [('222', 'review1')]
+
+        await db.delete_user_articles(2, ['222'])
+        assert await db._fetchall("SELECT id FROM reviews") == []
+
+    run(tmp_path / "test.db", scenario)
+
+
+def test_marks_compare_dates_as_moments(tmp_path):
+    async def scenario(db):
+        await db.add_user_urls(1, [('111', 'url1', '900')], limit=10)
+        await db.add_user_urls(2, [('111', 'url1', '900')], limit=10)
+        marks = {'111': ('2024-02-01T10:00:00Z', 'review1')}
+        await db.update_review_marks(marks)
+        await db.update_subscription_marks(marks)
+
+        # Как строка '...00.5Z' меньше '...00Z', но как момент времени - позже
+        newer = {'111': ('2024-02-01T10:00:00.5Z', 'review2')}
+        await db.update_review_marks(newer)
+        await db.update_subscription_marks(newer, user_id=1)
+        assert await db.get_review_marks() == {'111': '2024-02-01T10:00:00.5Z'}
+        assert await db.get_subscription_marks(1) == {'111': '2024-02-01T10:00:00.5Z'}
+        assert await db.get_subscription_marks(2) == {'111': '2024-02-01T10:00:00Z'}
+
+        # Та же минута со смещением +03:00 - на три часа раньше, метка не сдвигается назад
+        older = {'111': ('2024-02-01T10:00:01+03:00', 'review0')}
+        await db.update_review_marks(older)
+        await db.update_subscription_marks(older)
+        assert await db.get_review_marks() == {'111': '2024-02-01T10:00:00.5Z'}
+        assert await db.get_subscription_marks(2) == {'111': '2024-02-01T10:00:00Z'}
+
+    run(tmp_path / "test.db", scenario)
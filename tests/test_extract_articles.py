@@ -0,0 +1,22 @@
+import pytest
+
+from src.parser import extract_articles
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("https://www.wildberries.ru/catalog/44587938/detail.aspx", ["44587938"]),
+    ("https://www.wildberries.ru/catalog/44587938/detail.aspx?size=1", ["44587938"]),
+    ("wildberries.ru/catalog/44587938", ["44587938"]),
+    ("https://m.wildberries.by/catalog/44587938/", ["44587938"]),
+    ("https://wb.ru/product?card=44587938", ["44587938"]),
+    ("https://www.wildberries.ru/catalog/0/search.aspx?search=чайник&nm=123456", ["123456"]),
+    ("https://www.wildberries.ru/catalog/0/search.aspx?search=чайник", []),
+    ("https://www.wildberries.ru/catalog/111111/detail.aspx,https://www.wildberries.ru/catalog/222222/detail.aspx",
+     ["111111", "222222"]),
+    ("https://www.wildberries.ru/catalog/111111/detail.aspx;https://wb.ru/p?nm=222222;333333",
+     ["111111", "222222", "333333"]),
+    ("44587938, 12345678\n87654321", ["44587938", "12345678", "87654321"]),
+    ("цена 1234.56 и 4.5 звезды", []),
+])
+def test_extract_articles(text, expected):
+    assert extract_articles(text) == expected
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+from src.parser import AsyncWildberriesReviewParser
+from src.single_flight import SingleFlight
+
+DOCUMENT = json.dumps({"feedbacks": [
+    {"id": "1", "text": "брак", "productValuation": 1, "createdDate": "2024-01-01T00:00:00Z"},
+]}).encode()
+
+
+class FakeResponse:
+    status = 200
+    headers = {"ETag": '"1"'}
+    content_length = len(DOCUMENT)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self):
+        return DOCUMENT
+
+
+def test_feedbacks_cache_evicts_least_recently_used():
+    async def scenario():
+        parser = AsyncWildberriesReviewParser(feedbacks_cache_size=3)
+
+        async def request_feedbacks(path, headers=None):
+            return FakeResponse()
+
+        parser._request_feedbacks = request_feedbacks
+        # Без кэша результатов: каждый вызов доходит до кэша документов
+        parser._reviews_flights = SingleFlight()
+        for root_id in ["1", "2", "3", "1", "4", "5"]:
+            await parser.parse_root_id(root_id)
+
+        assert list(parser._feedbacks_cache) == ["1", "4", "5"]
+
+    asyncio.run(scenario())
+
+
+class NotModifiedResponse(FakeResponse):
+    status = 304
+
+
+def test_not_modified_survives_concurrent_cache_reset():
+    async def scenario():
+        parser = AsyncWildberriesReviewParser()
+        parser._reviews_flights = SingleFlight()
+
+        async def request_feedbacks(path, headers=None):
+            return FakeResponse()
+
+        parser._request_feedbacks = request_feedbacks
+        first = await parser.parse_root_id("1")
+
+        async def request_not_modified(path, headers=None):
+            # Пока идет запрос, параллельная загрузка нового документа сбрасывает запись
+            entry = parser._feedbacks_cache["1"]
+            entry.digest = "другой документ"
+            entry.full_result = None
+            return NotModifiedResponse()
+
+        parser._request_feedbacks = request_not_modified
+        assert await parser.parse_root_id("1") == first
+
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from src.json_stream import JsonArrayStreamDecoder
+
+DOCUMENTS = [
+    b'{"v": 4.6, "feedbacks": [{"id": 1}], "n": 1.5e-3}',
+    b'{"feedbackCount": -12, "rating": 4.25E+2, "feedbacks": [1, -2.5, 3e4, 0.125, {"x": [1.0, true, null]}], "z": 0}',
+    '{"valuation": "4.6", "feedbacks": [{"text": "Товар с браком ✓", "productValuation": 1}, {"text": ""}], "ok": false}'.encode(),
+    b'{"feedbacks": [], "tail": 10}',
+    b'{"feedbacks": null}',
+]
+
+
+def decode_in_parts(document: bytes, *offsets: int) -> list:
+    decoder = JsonArrayStreamDecoder('feedbacks')
+    items = []
+    bounds = [0, *offsets, len(document)]
+    for start, end in zip(bounds, bounds[1:]):
+        items.extend(decoder.feed(document[start:end]))
+    items.extend(decoder.close())
+    return items
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_split_at_every_offset(document):
+    expected = json.loads(document)['feedbacks'] or []
+    for offset in range(len(document) + 1):
+        assert decode_in_parts(document, offset) == expected, f"разрез на позиции {offset}"
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_byte_by_byte(document):
+    expected = json.loads(document)['feedbacks'] or []
+    assert decode_in_parts(document, *range(1, len(document))) == expected
+
+
+@pytest.mark.parametrize("first, second", [
+    (b'{"v": 4.', b'6, "feedbacks": [1]}'),
+    (b'{"v": 1.5e', b'3, "feedbacks": [1]}'),
+    (b'{"v": 1.5e-', b'3, "feedbacks": [1]}'),
+    (b'{"feedbacks": [1, 2', b'5]}'),
+])
+def test_number_split_after_separator(first, second):
+    assert decode_in_parts(first + second, len(first)) == json.loads(first + second)['feedbacks']
+
+
+@pytest.mark.parametrize("document", [b'{"feedbacks": [1, 2', b'{"feedbacks": [1, 2.', b'{"feedbacks": [1] "x": 1}'])
+def test_invalid_document_raises(document):
+    with pytest.raises(ValueError):
+        decode_in_parts(document)
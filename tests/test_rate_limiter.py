@@ -0,0 +1,121 @@
+import asyncio
+
+from src.parser import AsyncWildberriesReviewParser
+from src.rate_limiter import HostLimiter
+
+URL = "https://feedbacks1.wb.ru/feedbacks/v2/1"
+
+
+class HangingSession:
+    """Сессия, запрос которой не завершается, пока его не отменят"""
+    closed = False
+
+    async def get(self, url, headers=None):
+        await asyncio.sleep(3600)
+
+
+def open_breaker(limiter: HostLimiter):
+    # Разомкнутый breaker, который сразу готов пропустить пробный запрос
+    limiter.breaker.open_seconds = 0
+    for _ in range(limiter.breaker.min_calls):
+        limiter.breaker.record(False)
+    assert limiter.breaker.is_open
+
+
+def test_cancelled_probe_request_releases_breaker():
+    async def scenario():
+        parser = AsyncWildberriesReviewParser()
+        parser._session = HangingSession()
+        limiter = parser.rate_limiter.for_host("feedbacks1.wb.ru")
+        open_breaker(limiter)
+
+        task = asyncio.ensure_future(parser._request(URL))
+        await asyncio.sleep(0.01)
+        assert not limiter.available
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert limiter.available
+        assert limiter.breaker.is_open
+
+    asyncio.run(scenario())
+
+
+def test_probe_cancelled_while_waiting_for_token_releases_breaker():
+    async def scenario():
+        limiter = HostLimiter("feedbacks1.wb.ru")
+        open_breaker(limiter)
+        limiter.bucket.pause(3600)
+
+        task = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not limiter.available
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert limiter.available
+
+    asyncio.run(scenario())
+
+
+def test_recorded_probe_closes_breaker():
+    async def scenario():
+        limiter = HostLimiter("feedbacks1.wb.ru")
+        open_breaker(limiter)
+
+        probe = await limiter.acquire()
+        assert probe
+        limiter.on_success()
+        limiter.release_probe(probe)
+
+        assert not limiter.breaker.is_open
+        assert not await limiter.acquire()
+
+    asyncio.run(scenario())
+
+
+class StubResponse:
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+
+    def release(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def json(self, content_type=None):
+        return {}
+
+
+class ThrottlingSession:
+    """Один хост всегда отвечает 429 с долгим Retry-After, остальные - 200"""
+    closed = False
+
+    async def get(self, url, headers=None):
+        if "throttled" in url:
+            return StubResponse(429, {"Retry-After": "3600"})
+        return StubResponse(200)
+
+
+def test_backoff_sleep_does_not_hold_concurrency_slot():
+    async def scenario():
+        parser = AsyncWildberriesReviewParser(concurrency=1)
+        parser._session = ThrottlingSession()
+
+        throttled = asyncio.ensure_future(parser._get_json("https://throttled.wb.ru/1"))
+        await asyncio.sleep(0.01)
+        # Первый запрос ждет повтора; единственный слот свободен для остальных
+        assert await asyncio.wait_for(parser._get_json("https://healthy.wb.ru/1"), timeout=1) == {}
+
+        throttled.cancel()
+        await asyncio.gather(throttled, return_exceptions=True)
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+import random
+
+from config.settings import MAX_REVIEWS
+from src.parser import (ReviewsSelector, has_review_content, is_low_rating, review_history_row,
+                        review_timestamp_key)
+
+DATES = [
+    "2024-01-01T10:00:00Z",
+    "2024-01-01T10:00:00.5Z",
+    "2024-01-01T13:00:00+03:00",
+    "2024-01-01T10:00:01Z",
+    "2024-01-02T00:00:00Z",
+    "",
+]
+
+
+def make_reviews(count: int, seed: int):
+    # Мало разных дат, чтобы было много равных, и разные записи одного момента времени
+    rng = random.Random(seed)
+    return [
+        {
+            "id": str(i),
+            "text": rng.choice(["", "  ", "брак"]),
+            "pros": rng.choice(["", "цена"]) if rng.random() < 0.2 else "",
+            "productValuation": rng.randint(1, 5),
+            "createdDate": rng.choice(DATES),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_pipeline(reviews, limit=MAX_REVIEWS):
+    """Последовательный filter -> sort -> filter, который заменил ReviewsSelector"""
+    with_content = [review for review in reviews if has_review_content(review)]
+    latest = sorted(with_content, key=lambda review: review_timestamp_key(review["createdDate"]), reverse=True)
+    return [review for review in latest[:limit] if is_low_rating(review)]
+
+
+def newest(reviews):
+    return max(reviews, key=lambda review: review_timestamp_key(review["createdDate"]), default=None)
+
+
+def test_selector_matches_legacy_pipeline():
+    for seed in range(50):
+        reviews = make_reviews(random.Random(seed).randint(0, 40), seed)
+        for limit in (0, 1, MAX_REVIEWS, 100):
+            selector = ReviewsSelector(limit=limit)
+            # Отзывы приходят частями, как при потоковом разборе
+            selector.extend(reviews[:7])
+            for review in reviews[7:]:
+                selector.add(review)
+            result = selector.result()
+
+            assert result.reviews == legacy_pipeline(reviews, limit)
+            expected_newest = newest(reviews)
+            assert result.newest_id == (expected_newest["id"] if expected_newest else None)
+
+
+def test_selector_with_since_keeps_all_newer_low_ratings():
+    since = "2024-01-01T10:00:00Z"
+    for seed in range(50):
+        reviews = make_reviews(30, seed)
+        history = []
+        selector = ReviewsSelector(since, history=history)
+        selector.extend(reviews)
+        result = selector.result()
+
+        newer = [
+            review for review in reviews
+            if review_timestamp_key(review["createdDate"]) > review_timestamp_key(since)
+        ]
+        assert result.reviews == legacy_pipeline(newer, limit=len(newer))
+        assert history == [review_history_row(review) for review in newer]
+        assert result.newest_id == (newest(newer)["id"] if newer else None)
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from src.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "результат"
+
+        waiters = [asyncio.ensure_future(flights.do("1", fetch)) for _ in range(5)]
+        other = asyncio.ensure_future(flights.do("2", fetch))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*waiters) == ["результат"] * 5
+        assert await other == "результат"
+        assert calls == 2
+
+        # После завершения без ttl следующий вызов снова выполняет func
+        await flights.do("1", fetch)
+        assert calls == 3
+
+    asyncio.run(scenario())
+
+
+def test_exception_propagates_to_every_caller_and_is_not_cached():
+    async def scenario():
+        flights = SingleFlight(ttl=60)
+        calls = 0
+
+        async def fail():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise ValueError("ошибка")
+
+        results = await asyncio.gather(*(flights.do("1", fail) for _ in range(3)), return_exceptions=True)
+        assert calls == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+        with pytest.raises(ValueError):
+            await flights.do("1", fail)
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_result_is_cached_for_ttl():
+    async def scenario():
+        flights = SingleFlight(ttl=60)
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await flights.do("1", fetch) == 1
+        assert await flights.do("1", fetch) == 1
+        assert calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "результат"
+
+        cancelled = asyncio.ensure_future(flights.do("1", fetch))
+        waiting = asyncio.ensure_future(flights.do("1", fetch))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        release.set()
+
+        assert await waiting == "результат"
+        assert cancelled.cancelled()
+
+    asyncio.run(scenario())
@@ -0,0 +1,91 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.webhook import QueuedRequestHandler
+
+SECRET = "secret"
+
+
+def make_update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Тест"},
+            "text": text,
+        },
+    }
+
+
+def run_webhook(queue_size: int, scenario):
+    async def wrapper():
+        dispatcher = Dispatcher()
+        received = []
+        # Обработчик ждет, пока сценарий не разрешит ему завершиться
+        release = asyncio.Event()
+
+        @dispatcher.message()
+        async def on_message(message):
+            await release.wait()
+            received.append(message.text)
+
+        bot = Bot("42:TEST")
+        handler = QueuedRequestHandler(dispatcher, bot, workers=1, queue_size=queue_size,
+                                       secret_token=SECRET)
+        app = web.Application()
+        app.on_startup.append(handler.start_workers)
+        app.on_shutdown.append(handler.stop_workers)
+        handler.register(app, path="/webhook")
+
+        async with TestClient(TestServer(app)) as client:
+            await scenario(client, received, release)
+        await bot.session.close()
+
+    asyncio.run(wrapper())
+
+
+async def wait_for(condition):
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("условие не выполнилось")
+
+
+def test_update_is_processed_through_queue():
+    async def scenario(client, received, release):
+        release.set()
+        response = await client.post(
+            "/webhook", json=make_update(1, "привет"),
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+        )
+        assert response.status == 200
+        await wait_for(lambda: received)
+        assert received == ["привет"]
+
+    run_webhook(queue_size=10, scenario=scenario)
+
+
+def test_wrong_secret_and_full_queue_are_rejected():
+    async def scenario(client, received, release):
+        response = await client.post("/webhook", json=make_update(1, "чужой"),
+                                     headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+        assert response.status == 401
+
+        # Воркер занят первым апдейтом, второй ждет в очереди, третий в нее не помещается
+        headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+        assert (await client.post("/webhook", json=make_update(2, "раз"), headers=headers)).status == 200
+        await asyncio.sleep(0.05)
+        assert (await client.post("/webhook", json=make_update(3, "два"), headers=headers)).status == 200
+        assert (await client.post("/webhook", json=make_update(4, "три"), headers=headers)).status == 503
+
+        release.set()
+        await wait_for(lambda: len(received) == 2)
+        assert received == ["раз", "два"]
+
+    run_webhook(queue_size=1, scenario=scenario)